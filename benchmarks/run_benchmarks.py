@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from simulation_settings import SESSION_SETTINGS, TRACK_SETTINGS
+from simulation.environment import Environment
+from simulation.car import Car
+from simulation.track_cache import compile_track, track_colours
+from simulation.track_grid import ROAD, OFF_ROAD, find_start_pose, distance_field
+from q_learning_implementation.agent import QLearningAgent
+from q_learning_implementation import q_table_store
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, "results.json")
+SHIPPED_Q_TABLE = os.path.join("q_learning_implementation", "q_tables", "q_table.json")
+TRACKS = ["track_1.png", "track_2.png"]
+SEED = 1234
+CHUNK_CALLS = 100  # Calls timed together by per_call
+FAST_REPEATS = 4  # Extra repeats for calls of a few milliseconds or less, whose best times are the noisiest
+# Slowdowns smaller than this many units are timer and scheduler noise, whatever their percentage
+NOISE_FLOOR = {"us/call": 2.0}
+
+
+def per_call(func, args_list, repeats, chunk=CHUNK_CALLS):
+    """
+    Best mean time per call, in microseconds, over a fixed list of arguments.
+    The list is timed in chunks and the fastest chunk of any repeat wins, so a
+    slow stretch of a shared machine only costs the chunks it overlaps.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        for i in range(0, len(args_list), chunk):
+            calls = args_list[i:i + chunk]
+            start = time.perf_counter()
+            for args in calls:
+                func(*args)
+            best = min(best, (time.perf_counter() - start) / len(calls))
+    return best * 1e6
+
+
+def result(value, unit, higher_is_better=False):
+    return {"value": round(value, 3), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def road_poses(environment, n, rng):
+    """n seeded (x, y, angle) poses on road pixels of the track."""
+    ys, xs = np.nonzero(environment.TRACK_GRID == ROAD)
+    picks = rng.choice(len(xs), n)
+    angles = rng.uniform(0, 360, n)
+    return [(float(xs[i]) + 0.5, float(ys[i]) + 0.5, float(angle)) for i, angle in zip(picks, angles)]
+
+
+def bench_track(track, n_calls, repeats, episodes):
+    results = {}
+    rng = np.random.default_rng(SEED)
+    img_path = os.path.join(PROJECT_ROOT, "tracks", track)
+
+    results["track_cache.compile_track"] = result(
+        per_call(compile_track, [(img_path, 900, 600, track_colours())], repeats) / 1000, "ms/call")
+    environment = Environment(track, headless=True)  # Makes sure the track bundle is cached
+    results["environment.init_cached"] = result(
+        per_call(Environment, [(track, True)] * 3, repeats * FAST_REPEATS) / 1000, "ms/call")
+    results["track_grid.find_start_pose"] = result(
+        per_call(find_start_pose, [(environment.TRACK_GRID,)], repeats * FAST_REPEATS) / 1000, "ms/call")
+    results["track_grid.distance_field"] = result(
+        per_call(distance_field, [(environment.TRACK_GRID != OFF_ROAD, TRACK_SETTINGS["DISTANCE_FIELD_MAX"])],
+                 repeats) / 1000, "ms/call")
+
+    car = Car(environment)
+    poses = road_poses(environment, n_calls, rng)
+    repeats *= FAST_REPEATS  # Everything below but the episodes times microsecond-scale calls
+
+    def sensor_distance(x, y, angle):
+        car.x, car.y, car.angle = x, y, angle
+        return car.sensors[3].make_sensor_distance(environment)
+    results["sensor.make_sensor_distance"] = result(per_call(sensor_distance, poses, repeats), "us/call")
+
+    def update_sensors(x, y, angle):
+        car.x, car.y, car.angle = x, y, angle
+        car.update_sensors()
+    results["car.update_sensors"] = result(per_call(update_sensors, poses, repeats), "us/call")
+
+    def road_status(x, y, angle):
+        car.angle = angle
+        return car.check_road_status(x, y)
+    results["car.check_road_status"] = result(per_call(road_status, poses, repeats), "us/call")
+
+    # Short moves from each pose, as a car makes every step
+    moves = [(x, y, x + 1.5 * np.cos(np.radians(angle)), y - 1.5 * np.sin(np.radians(angle))) for x, y, angle in poses]
+
+    def checkpoint(x0, y0, x1, y1):
+        car.x, car.y = x1, y1
+        car.update_progress(x0, y0)
+        return car.check_checkpoint()
+    results["car.check_checkpoint"] = result(per_call(checkpoint, moves, repeats), "us/call")
+
+    results["episode.steps_per_sec"] = result(run_episodes(environment, car, episodes), "steps/s", higher_is_better=True)
+    return results
+
+
+def run_episodes(environment, car, episodes):
+    """Training steps per second over full headless episodes, from a fixed seed and a fresh table."""
+    from main import run_headless_episode
+
+    random.seed(SEED)
+    agent = QLearningAgent(car.state_encoder.feature_count, 4)
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(episodes):
+        environment.clock.reset()
+        car.reset()
+        run_headless_episode(environment, car, agent)
+        steps += environment.clock.steps
+    return steps / (time.perf_counter() - start)
+
+
+def bench_agent(n_calls, repeats):
+    results = {}
+    scratch = tempfile.mkdtemp(prefix="q_table_bench_")
+    try:
+        agent = QLearningAgent(9, 4)
+        start = time.perf_counter()
+        agent.q_table = q_table_store.read_json(SHIPPED_Q_TABLE, agent.action_size)
+        results["agent.load_q_table_json"] = result((time.perf_counter() - start) * 1000, "ms/call")
+
+        rng = random.Random(SEED)
+        keys = agent.q_table.keys[:len(agent.q_table)].tolist()
+        states = [(rng.choice(keys), False) for _ in range(n_calls)]  # Greedy lookups
+        transitions = [(rng.choice(keys), rng.randrange(4), rng.uniform(-1, 1), rng.choice(keys)) for _ in range(n_calls)]
+        results["agent.get_action"] = result(per_call(agent.get_action, states, repeats * FAST_REPEATS), "us/call")
+        results["agent.update_q_value"] = result(
+            per_call(agent.update_q_value, transitions, repeats * FAST_REPEATS), "us/call")
+
+        agent.q_table_path = os.path.join(scratch, "q_table.qtb")
+        full_save = lambda: (setattr(agent, "_stored_path", None), agent.save_q_table())
+        results["agent.save_q_table_full"] = result(per_call(full_save, [()], repeats * FAST_REPEATS) * 1e-3, "ms/call")
+        incremental = float("inf")
+        for i in range(repeats * FAST_REPEATS):  # A save after 200 updates each time, the best one counts
+            for args in transitions[200 * i:200 * (i + 1)]:
+                agent.update_q_value(*args)
+            incremental = min(incremental, per_call(agent.save_q_table, [()], 1))
+        results["agent.save_q_table_incremental"] = result(incremental * 1e-3, "ms/call")
+        results["agent.load_q_table_binary"] = result(
+            per_call(agent.load_q_table, [()], repeats * FAST_REPEATS) * 1e-3, "ms/call")
+
+        agent.q_table_path = os.path.join(scratch, "q_table.json")
+        results["agent.save_q_table_json"] = result(per_call(agent.save_q_table, [()], repeats) * 1e-3, "ms/call")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def best_result(a, b):
+    better = max if a["higher_is_better"] else min
+    return a if better(a["value"], b["value"]) == a["value"] else b
+
+
+def run_all(quick=False, runs=1):
+    """Every benchmark, run runs times over; each metric keeps its best run."""
+    n_calls, repeats, episodes = (500, 2, 3) if quick else (5000, 5, 10)
+    saved_settings = dict(SESSION_SETTINGS)
+    SESSION_SETTINGS.update({"TRAINING_MODE": True, "HEADLESS": True, "PROFILE": False})
+    try:
+        results = {}
+        for _ in range(runs):
+            run = {}
+            for track in TRACKS:
+                for name, value in bench_track(track, n_calls, repeats, episodes).items():
+                    run[f"{os.path.splitext(track)[0]}/{name}"] = value
+            run.update(bench_agent(n_calls, repeats))
+            results = {name: best_result(results[name], value) if name in results else value
+                       for name, value in run.items()}
+    finally:
+        SESSION_SETTINGS.update(saved_settings)
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+            "runs": runs,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """
+    Print every metric against the baseline and return the names of regressions:
+    metrics worse than the baseline by more than tolerance (0.25 = 25%) and by more
+    than the NOISE_FLOOR of their unit.
+    """
+    regressions = []
+    print(f"{'benchmark':48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current_result in current["results"].items():
+        base = baseline["results"].get(name)
+        value = current_result["value"]
+        if base is None or not base["value"]:
+            print(f"{name:48} {'-':>12} {value:>12.3f}")
+            continue
+        change = value / base["value"] - 1
+        worse = -change if current_result["higher_is_better"] else change
+        above_noise = abs(value - base["value"]) > NOISE_FLOOR.get(current_result["unit"], 0)
+        flag = "  REGRESSION" if worse > tolerance and above_noise else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:48} {base['value']:>12.3f} {value:>12.3f} {change:>+8.1%} {current_result['unit']}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the simulator and agent benchmarks.")
+    parser.add_argument("--quick", action="store_true", help="Fewer calls and episodes, for a fast check")
+    parser.add_argument("--output", default=RESULTS_PATH, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results to compare against")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Run everything this many times and keep each metric's best, to ride out a busy machine")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a regression is flagged")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)  # The agent and trainer use paths relative to the project root
+    current = run_all(args.quick, args.runs)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against, run with --save-baseline to create one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from q_learning_logs.episode_log import EpisodeLog, EXTENSION
+
+
+class LogTail:
+    """Reads only the episodes appended to a training log since the last read."""
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.binary = log_file.endswith(EXTENSION)
+        self.position = 0  # Records read from a binary log, bytes read from a text log
+        self.episodes_read = 0
+
+    def read_new(self):
+        """New (episodes, scores, records) since the last call; records is None for text logs."""
+        if not os.path.exists(self.log_file):
+            return np.zeros(0, dtype=np.int64), np.zeros(0), None
+        if self.binary:
+            records = np.array(EpisodeLog(self.log_file).load(self.position))  # Copy, the file keeps growing
+            self.position += len(records)
+            self.episodes_read += len(records)
+            return records["episode"], records["score"], records
+
+        with open(self.log_file, "rb") as f:
+            f.seek(self.position)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]  # A line still being written is read next time
+        self.position += len(complete)
+        scores = np.array([float(line) for line in complete.split()], dtype=np.float64)
+        episodes = np.arange(self.episodes_read + 1, self.episodes_read + 1 + len(scores))
+        self.episodes_read += len(scores)
+        return episodes, scores, None
+
+
+class RollingStats:
+    """Totals over every episode and the mean of the last window episodes, updated per chunk."""
+    def __init__(self, window=100):
+        self.window = window
+        self.count = 0
+        self.total = 0.0
+        self.best = -np.inf
+        self.worst = np.inf
+        self._recent = np.zeros(0)  # Last window scores
+
+    def update(self, scores):
+        """Add a chunk of scores and return the rolling mean after each of them."""
+        scores = np.asarray(scores, dtype=np.float64)
+        if not len(scores):
+            return scores
+        joined = np.concatenate([self._recent, scores])
+        sums = np.concatenate([[0.0], np.cumsum(joined)])
+        ends = np.arange(len(self._recent) + 1, len(joined) + 1)
+        starts = np.maximum(ends - self.window, 0)
+        rolling = (sums[ends] - sums[starts]) / (ends - starts)
+
+        self._recent = joined[-self.window:]
+        self.count += len(scores)
+        self.total += float(scores.sum())
+        self.best = max(self.best, float(scores.max()))
+        self.worst = min(self.worst, float(scores.min()))
+        return rolling
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def recent_mean(self):
+        return float(self._recent.mean()) if len(self._recent) else 0.0
+
+
+class BucketSeries:
+    """
+    Scores downsampled to at most max_buckets buckets of min, max and mean.
+    When the buckets run out, neighbouring pairs merge and the bucket size doubles,
+    so memory and redraw cost stay constant however long training runs.
+    """
+    def __init__(self, max_buckets=500):
+        self.max_buckets = max(2, max_buckets - max_buckets % 2)  # Even, so buckets merge in pairs
+        self.bucket_size = 1
+        self.n = 0
+        self.ends = np.zeros(self.max_buckets, dtype=np.int64)  # Last episode in each bucket
+        self.mins = np.zeros(self.max_buckets)
+        self.maxs = np.zeros(self.max_buckets)
+        self.sums = np.zeros(self.max_buckets)
+        self.counts = np.zeros(self.max_buckets, dtype=np.int64)
+        self.rolling = np.zeros(self.max_buckets)  # Rolling mean at the end of each bucket
+
+    def extend(self, episodes, scores, rolling):
+        i, total = 0, len(scores)
+        while i < total:
+            last = self.n - 1
+            if self.n and self.counts[last] < self.bucket_size:
+                # Top up the partial last bucket
+                take = min(self.bucket_size - self.counts[last], total - i)
+                chunk = scores[i:i + take]
+                self.mins[last] = min(self.mins[last], chunk.min())
+                self.maxs[last] = max(self.maxs[last], chunk.max())
+                self.sums[last] += chunk.sum()
+                self.counts[last] += take
+                self.ends[last], self.rolling[last] = episodes[i + take - 1], rolling[i + take - 1]
+                i += take
+            elif self.n == self.max_buckets:
+                self._merge()
+            else:
+                # As many whole buckets as fit, in one go
+                whole = min((total - i) // self.bucket_size, self.max_buckets - self.n)
+                if whole:
+                    size = self.bucket_size
+                    block = scores[i:i + whole * size].reshape(whole, size)
+                    new = slice(self.n, self.n + whole)
+                    self.mins[new], self.maxs[new], self.sums[new] = block.min(axis=1), block.max(axis=1), block.sum(axis=1)
+                    self.counts[new] = size
+                    self.ends[new] = episodes[i + size - 1:i + whole * size:size]
+                    self.rolling[new] = rolling[i + size - 1:i + whole * size:size]
+                    self.n += whole
+                    i += whole * size
+                else:
+                    self.mins[self.n], self.maxs[self.n], self.sums[self.n], self.counts[self.n] = np.inf, -np.inf, 0.0, 0
+                    self.n += 1
+
+    def _merge(self):
+        """Merge neighbouring pairs of (full) buckets and double the bucket size."""
+        half = self.n // 2
+        self.mins[:half] = np.minimum(self.mins[0:self.n:2], self.mins[1:self.n:2])
+        self.maxs[:half] = np.maximum(self.maxs[0:self.n:2], self.maxs[1:self.n:2])
+        self.sums[:half] = self.sums[0:self.n:2] + self.sums[1:self.n:2]
+        self.counts[:half] = self.counts[0:self.n:2] + self.counts[1:self.n:2]
+        self.ends[:half] = self.ends[1:self.n:2]
+        self.rolling[:half] = self.rolling[1:self.n:2]
+        self.n = half
+        self.bucket_size *= 2
+
+    def arrays(self):
+        """(ends, mins, maxs, means, rolling) of the buckets so far."""
+        n = self.n
+        return self.ends[:n], self.mins[:n], self.maxs[:n], self.sums[:n] / np.maximum(self.counts[:n], 1), self.rolling[:n]
+
+
+class LiveDashboard:
+    """
+    Progress plot that follows a training log while it grows.
+    Every interval it reads only the new episodes, updates the rolling statistics
+    and the downsampled series, and redraws a fixed number of points.
+    """
+    def __init__(self, log_file, interval=1.0, window=100, max_buckets=500):
+        self.tail = LogTail(log_file)
+        self.stats = RollingStats(window)
+        self.series = BucketSeries(max_buckets)
+        self.interval = interval
+        self.last_record = None  # Latest binary log record, for epsilon and Q-table size
+
+    def poll(self):
+        """Take in new episodes; returns how many there were."""
+        episodes, scores, records = self.tail.read_new()
+        if len(scores):
+            rolling = self.stats.update(scores)
+            self.series.extend(episodes, scores, rolling)
+            if records is not None:
+                self.last_record = records[-1]
+        return len(scores)
+
+    def stats_text(self):
+        text = f"Total Episodes: {self.stats.count}\n"
+        text += f"Avg Score (last {self.stats.window}): {self.stats.recent_mean:.2f}\n"
+        text += f"Best: {self.stats.best:.2f}  Worst: {self.stats.worst:.2f}"
+        record = self.last_record
+        if record is not None and record["q_table_size"] >= 0:  # Records from the text log import have no metrics
+            text += f"\nEpsilon: {record['epsilon']:.3f}  States: {record['q_table_size']}"
+            text += f"\nSteps/sec: {record['steps_per_sec']:.0f}"
+        return text
+
+    def show(self):
+        import matplotlib.pyplot as plt
+        from matplotlib.animation import FuncAnimation
+
+        fig, ax = plt.subplots(figsize=(12, 8))
+        mean_line, = ax.plot([], [], color='blue', label='Mean per bucket')
+        rolling_line, = ax.plot([], [], color='orange', label=f'Moving average (window: {self.stats.window})')
+        band = ax.fill_between([], [], [], color='lightblue', alpha=0.5, label='Min/max per bucket')
+        stats_box = ax.text(0.02, 0.02, "", transform=ax.transAxes,
+                            bbox=dict(facecolor='white', alpha=0.8), fontsize=10,
+                            verticalalignment='bottom')
+        ax.set_xlabel("Episode Number", fontsize=12)
+        ax.set_ylabel("Score", fontsize=12)
+        ax.grid(True, linestyle=':', alpha=0.6)
+        ax.legend(loc='upper left', fontsize=10)
+        fig.canvas.manager.set_window_title('Agent Progress: Live')
+
+        def update(_):
+            nonlocal band
+            if not self.poll() or not self.series.n:
+                return
+            ends, mins, maxs, means, rolling = self.series.arrays()
+            mean_line.set_data(ends, means)
+            rolling_line.set_data(ends, rolling)
+            band.remove()
+            band = ax.fill_between(ends, mins, maxs, color='lightblue', alpha=0.5)
+            stats_box.set_text(self.stats_text())
+            ax.relim()
+            ax.autoscale_view()
+            ax.set_xlim(0, max(int(ends[-1]), 1))
+
+        # Kept on self so the animation is not garbage collected while the window is open
+        self._animation = FuncAnimation(fig, update, interval=int(self.interval * 1000), cache_frame_data=False)
+        plt.tight_layout()
+        plt.show()
@@ -1,13 +1,27 @@
 import os
+import argparse
 from visualization import Visualizer
+from live_dashboard import LiveDashboard
 
 def main():
+    parser = argparse.ArgumentParser(description="Plot the agent's training progress.")
+    parser.add_argument("--live", action="store_true", help="Keep following the log while training runs")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between live updates")
+    parser.add_argument("--log", default="q_table", help="Log name in q_learning_logs, without extension")
+    args = parser.parse_args()
+
     parent_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    log_file = os.path.join(parent_directory, "q_learning_logs", "q_table.txt")
+    log_file = os.path.join(parent_directory, "q_learning_logs", args.log + ".eplog")
+    if not os.path.exists(log_file):
+        log_file = os.path.join(parent_directory, "q_learning_logs", args.log + ".txt")  # Logs from before the binary log
+
+    if args.live:
+        LiveDashboard(log_file, interval=args.interval).show()
+        return
 
     visualizer = Visualizer(log_file)
     visualizer.read_log()
     visualizer.plot_progress()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,22 +1,27 @@
 import sys
 import os
 
-from visualization import Visualizer
-from simulation_settings import QL_SETTINGS  # Use QL_SETTINGS, not QL_CONFIG
-
-# Add the grandparent directory to the path (for config.py)
+# Add the grandparent directory to the path (for simulation_settings.py)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-# Add the parent directory (for visualizer.py)
+# Add the parent directory (for visualization.py)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from visualization import Visualizer
+from simulation_settings import QL_SETTINGS, SESSION_SETTINGS
+from q_learning_implementation.exploration import ExplorationSchedule
+
 def main():
     grandparent_directory = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    log_file = os.path.join(grandparent_directory, "q_learning_logs", "q_table.txt")
+    log_name = os.path.splitext(QL_SETTINGS["Q_TABLE_FILENAME"])[0]
+    log_file = os.path.join(grandparent_directory, "q_learning_logs", log_name + ".eplog")
+    if not os.path.exists(log_file):
+        log_file = os.path.join(grandparent_directory, "q_learning_logs", log_name + ".txt")
 
     visualizer = Visualizer(log_file)
-    target_epsilon = QL_SETTINGS["MIN_EXPLORATION_RATE"]
-    visualizer.plot_exploration_rate_decay(target_epsilon, QL_SETTINGS["EXPLORATION_DECAY"])
+    # Upper bound; episodes that crash early take fewer steps and the log corrects for it
+    steps_per_episode = SESSION_SETTINGS["EPISODE_DURATION"] * SESSION_SETTINGS["STEPS_PER_SECOND"]
+    visualizer.plot_exploration_rate(ExplorationSchedule.from_settings(), steps_per_episode)
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,25 @@
+import os
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from q_learning_logs.episode_log import EpisodeLog, EXTENSION
+
 class Visualizer:
     def __init__(self, log_file=None):
         self.log_file = log_file
         self.episodes = []  # List to store episode numbers
         self.scores = []    # List to store scores
+        self.records = None  # Structured array of every metric, for binary episode logs
 
     def read_log(self):
-        if self.log_file:
+        if self.log_file and self.log_file.endswith(EXTENSION):
+            self.records = EpisodeLog(self.log_file).load()  # Memory-mapped, no parsing
+            self.episodes = self.records["episode"].tolist()
+            self.scores = self.records["score"].tolist()
+        elif self.log_file:
             with open(self.log_file, "r") as f:
                 for line in f:
                     score = float(line.strip())
@@ -66,58 +77,74 @@ class Visualizer:
         plt.tight_layout()
         plt.show()
 
-    def plot_exploration_rate_decay(self, target_epsilon, exploration_decay, initial_rate=1.0, extension_factor=1.2):
+    def plot_exploration_rate(self, schedule, steps_per_episode, extension_factor=1.2):
+        """
+        Plot the exploration rate per episode: the schedule's curve and, from a binary
+        episode log, the epsilon each logged episode actually ran with.
+        Step-based schedules are mapped to episodes with the logged steps per episode,
+        or steps_per_episode past the end of the log.
+        """
         # Read log file if not already done
         if not self.episodes:
             self.read_log()
-        
         total_episodes = len(self.episodes)
 
-        def calculate_iterations(target_rate):
-            if target_rate >= initial_rate:
-                return 0
-            if target_rate <= 0:
-                return float('inf')
-            return np.ceil(np.log(target_rate / initial_rate) / np.log(exploration_decay))
-
-        # Calculate iterations to target and extend
-        iterations_to_target = int(calculate_iterations(target_epsilon))
-        max_iterations = max(int(iterations_to_target * extension_factor), total_episodes)
-        
-        iterations = np.arange(max_iterations + 1)
-        exploration_rates = initial_rate * (exploration_decay ** iterations)
-
-        # Create the plot
+        logged_steps = np.zeros(0)
+        if self.records is not None:
+            logged_steps = np.where(self.records["steps"] >= 0, self.records["steps"], steps_per_episode)
+        if len(logged_steps):
+            steps_per_episode = float(np.mean(logged_steps))
+
+        units_to_end = schedule.units_to_end()
+        if schedule.unit == "step":
+            episodes_to_end = units_to_end / steps_per_episode
+        else:
+            episodes_to_end = units_to_end
+        if np.isfinite(episodes_to_end):
+            max_episodes = max(int(np.ceil(episodes_to_end * extension_factor)), total_episodes, 1)
+        else:
+            max_episodes = max(total_episodes, 1000)
+
+        # Units elapsed when each episode started
+        episodes = np.arange(max_episodes + 1)
+        if schedule.unit == "step":
+            steps = np.concatenate([[0.0], np.cumsum(logged_steps)])
+            extra = np.arange(1, max_episodes + 2 - len(steps)) * steps_per_episode + steps[-1]
+            units = np.concatenate([steps, extra])[:max_episodes + 1]
+        else:
+            units = episodes
+        planned_rates = schedule.rates(units)
+
         plt.figure(figsize=(12, 6))
-        plt.plot(iterations, exploration_rates, label='Exploration Rate')
-        plt.axhline(y=target_epsilon, color='r', linestyle='--', label='Target Epsilon')
-        
+        plt.plot(episodes, planned_rates, label=f'Schedule ({schedule.shape}, per {schedule.unit})')
+        if self.records is not None and len(self.records):
+            logged = self.records["epsilon"]
+            known = ~np.isnan(logged)
+            plt.plot(np.asarray(self.episodes)[known], logged[known], color='orange', alpha=0.8, label='Logged epsilon')
+        plt.axhline(y=schedule.end, color='r', linestyle='--', label='Target Epsilon')
+
         # Mark the total number of episodes from the log
         plt.axvline(x=total_episodes, color='g', linestyle='--', label='Total Episodes')
-        
-        plt.title(f'Exploration Rate Decay (Target: {target_epsilon}, Decay: {exploration_decay})')
-        plt.xlabel('Number of Iterations')
+
+        plt.title(f'Exploration Rate (Start: {schedule.start}, Target: {schedule.end})')
+        plt.xlabel('Episode')
         plt.ylabel('Exploration Rate')
         plt.legend()
         plt.grid(True)
-        
+
         plt.yscale('linear')
         plt.ylim(bottom=0, top=1.0)
-        plt.xlim(left=0, right=max_iterations)
-        
+        plt.xlim(left=0, right=max_episodes)
+
         # Set Y-axis ticks
         y_ticks = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
         plt.yticks(y_ticks, [f'{tick:.1f}' for tick in y_ticks])
-        
-        # Adjust X-axis ticks
-        x_ticks = list(range(0, max_iterations + 1, max(1, max_iterations // 10)))
-        plt.xticks(x_ticks)
-        
-        # Add text with iteration count and total episodes
-        plt.text(0.05, 0.95, f'Iterations to reach target: {iterations_to_target}\nTotal episodes: {total_episodes}', 
+
+        # Add text with the episodes to the target and total episodes
+        plt.text(0.05, 0.95, f'Episodes to reach target: {episodes_to_end:.0f}\nTotal episodes: {total_episodes}',
                  transform=plt.gca().transAxes, bbox=dict(facecolor='white', alpha=0.8),
                  verticalalignment='top')
-        
+
         plt.tight_layout()
         plt.show()
 
@@ -2,26 +2,107 @@ import os
 import pygame
 import subprocess
 import sys
-from simulation_settings import SESSION_SETTINGS
+import time
+import numpy as np
+from simulation_settings import SESSION_SETTINGS, QL_SETTINGS, COMPARISON_SETTINGS
 from simulation.car import Car
+from simulation.car_batch import CarBatch
 from simulation.environment import Environment
-from q_learning_implementation.agent import QLearningAgent
+from simulation.profiler import format_summary
+from q_learning_implementation.agent_factory import make_agent
+from q_learning_implementation.exploration import RandomStream
+from q_learning_implementation import training_checkpoint
 from q_learning_logs.logger import Logger
-from user_interface import launch_menu
+from q_learning_logs.checkpoint_writer import CheckpointWriter
+
+def run_headless_episode(environment, car, agent):
+    """
+    Run one episode without a window, rendering or frame cap.
+    Episode length is counted in simulation steps instead of wall-clock seconds.
+    """
+    max_steps = int(SESSION_SETTINGS["EPISODE_DURATION"] * SESSION_SETTINGS["STEPS_PER_SECOND"])
+    training = SESSION_SETTINGS["TRAINING_MODE"]
+    profiler = environment.profiler
+
+    state = agent.observe(car)
+    for _ in range(max_steps):
+        environment.clock.tick()
+        started = profiler.start()
+        action = agent.get_action(state, use_epsilon=training)
+        profiler.stop("agent.get_action", started)
+        car.handle_agent_action(action)
+        started = profiler.start()
+        reward = car.calculate_reward()
+        next_state = agent.observe(car)
+        profiler.stop("car.reward_state", started)
+        if training:
+            started = profiler.start()
+            agent.update_q_value(state, action, round(reward, 1), next_state)
+            agent.decay_exploration()
+            profiler.stop("agent.update", started)
+        state = next_state  # Encoded once per step
+        profiler.end_step()
+
+        if car.collided:
+            break
+
+    return car.score, False, False, False
+
+
+def run_batch_episode(environment, batch, agent):
+    """
+    Run one headless episode with every car of a CarBatch acting for the same agent.
+    The cars step together until time runs out or all of them have crashed; each
+    step is one batched action choice and one batched update. Returns the mean score.
+    """
+    max_steps = int(SESSION_SETTINGS["EPISODE_DURATION"] * SESSION_SETTINGS["STEPS_PER_SECOND"])
+    training = SESSION_SETTINGS["TRAINING_MODE"]
+    profiler = environment.profiler
+
+    states = batch.get_state_ids()
+    for _ in range(max_steps):
+        environment.clock.tick()
+        active = batch.active
+        started = profiler.start()
+        actions = agent.get_actions(states, use_epsilon=training)
+        profiler.stop("agent.get_action", started)
+        started = profiler.start()
+        batch.step(actions)
+        profiler.stop("batch.step", started)
+        started = profiler.start()
+        rewards = batch.calculate_reward()
+        next_states = batch.get_state_ids()
+        profiler.stop("car.reward_state", started)
+        if training:
+            started = profiler.start()
+            agent.update_q_values(states[active], actions[active], rewards[active], next_states[active])
+            agent.decay_exploration()
+            profiler.stop("agent.update", started)
+        states = next_states
+        profiler.end_step()
+
+        if batch.collided.all():
+            break
+
+    return float(batch.score.mean()), False, False, False
+
 
 def run_episode(environment, car, agent, manual_control):
-    clock = pygame.time.Clock()
-    start_ticks = pygame.time.get_ticks()
+    if environment.headless:
+        return run_headless_episode(environment, car, agent)
+
+    frame_clock = pygame.time.Clock()
     window_closed = False
     restart_episode = False
     end_simulation = False
+    state = agent.observe(car)
+    environment.renderer.invalidate()  # Full redraw on the first frame
+    profiler = environment.profiler
 
     while True:
-        clock.tick(240) # FPS
-        environment.clear_screen()
+        frame_clock.tick(SESSION_SETTINGS["STEPS_PER_SECOND"]) # FPS
 
-        elapsed = (pygame.time.get_ticks() - start_ticks) / 1000
-        time_left = max(0, SESSION_SETTINGS["EPISODE_DURATION"] - elapsed)
+        time_left = max(0, SESSION_SETTINGS["EPISODE_DURATION"] - environment.clock.time)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -38,40 +119,101 @@ def run_episode(environment, car, agent, manual_control):
         if time_left <= 0:
             break
 
-        environment.draw_track()
+        environment.clock.tick()
 
         if manual_control:
             car.handle_manual_input()
             car.calculate_reward()
         else:
-            state = car.get_state()
+            started = profiler.start()
             action = agent.get_action(state, use_epsilon=SESSION_SETTINGS["TRAINING_MODE"])
+            profiler.stop("agent.get_action", started)
             car.handle_agent_action(action)
+            started = profiler.start()
             reward = car.calculate_reward()
-            next_state = car.get_state()
+            next_state = agent.observe(car)
+            profiler.stop("car.reward_state", started)
             if SESSION_SETTINGS["TRAINING_MODE"]:
+                started = profiler.start()
                 agent.update_q_value(state, action, round(reward, 1), next_state)
                 agent.decay_exploration()
+                profiler.stop("agent.update", started)
+            state = next_state  # Encoded once per step
 
         if car.collided:
+            profiler.end_step()
             break
 
-        car.draw(environment.window)
-        environment.draw_text(car, time_left)
-        pygame.display.flip()
+        started = profiler.start()
+        environment.renderer.draw_frame([car], time_left)
+        profiler.stop("render", started)
+        profiler.end_step()
 
     return car.score, window_closed, end_simulation, restart_episode
 
 
+def episode_metrics(environment, car, agent, wall_time):
+    """Metrics of the episode that just ended, for the episode log; totals over the cars of a CarBatch."""
+    steps = environment.clock.steps
+    return {
+        "steps": steps,
+        "epsilon": agent.exploration_rate,
+        "collisions": int(np.sum(car.collided)),
+        "checkpoints": int(np.sum(car.checkpoints_hit)),
+        "laps": int(np.sum(car.lap)),
+        "q_table_size": agent.model_size(),
+        "steps_per_sec": steps / wall_time if wall_time > 0 else 0.0,
+        "wall_time": wall_time,
+    }
+
+
+def start_training_run(agent, logger, num_episodes):
+    """
+    Seed a fresh training run, or resume from the checkpoint saved with the agent's
+    Q-table. Returns the episode to start from: a run that was cut short carries on
+    with the episodes it had left, and its logged episodes after the checkpoint are
+    dropped because they are run again.
+    """
+    loaded = training_checkpoint.load(agent.q_table_path) if SESSION_SETTINGS["RESUME"] else None
+    if loaded is None:
+        if SESSION_SETTINGS["SEED"] is not None:
+            training_checkpoint.seed_agent(agent, SESSION_SETTINGS["SEED"])
+        return 0
+    checkpoint, arrays = loaded
+    for name, saved, current in training_checkpoint.changed_settings(checkpoint):
+        print(f"Warning: {name} was {saved} when the checkpoint was taken, now {current}")
+    run = training_checkpoint.restore(agent, checkpoint, arrays)
+    if logger is not None:
+        logger.truncate(run["log_length"])
+    if run["completed"] or run["num_episodes"] != num_episodes:
+        print(f"Continuing training from checkpoint, exploration rate {agent.exploration_rate:.3f}")
+        return 0
+    print(f"Resuming interrupted run at episode {run['episode'] + 1}/{num_episodes}, "
+          f"exploration rate {agent.exploration_rate:.3f}")
+    return run["episode"]
+
+
 def start_simulation(selected_track):
+    """
+    Train or evaluate one car on selected_track with the current settings. Returns a
+    summary of the session (see session_summary), or None if there was nothing to evaluate.
+    """
     # You can use selected_track to load the correct track in your Environment class
     print(f"Starting simulation with track: {selected_track}")
+    headless = SESSION_SETTINGS["HEADLESS"]
     pygame.display.quit()  # Close the menu window before starting simulation
-    pygame.display.init()
-    environment = Environment(selected_track)  # Pass selected_track to Environment
+    if not headless:
+        pygame.display.init()
+    environment = Environment(selected_track, headless=headless)  # Pass selected_track to Environment
     car = Car(environment)
-    state_size, action_size = 9, 4
-    agent = QLearningAgent(state_size, action_size)
+    state_size, action_size = car.state_encoder.feature_count, 4
+    agent = make_agent(state_size, action_size)
+    batch = None
+    if headless and SESSION_SETTINGS["NUM_CARS"] > 1:
+        if hasattr(agent, "get_actions"):
+            batch = CarBatch(environment, SESSION_SETTINGS["NUM_CARS"], car.state_encoder)
+        else:
+            print(f"Warning: the {QL_SETTINGS['AGENT_BACKEND']} backend drives one car at a time, ignoring NUM_CARS.")
 
     # Load Q-table based on mode
     q_loaded = agent.load_q_table()
@@ -86,21 +228,44 @@ def start_simulation(selected_track):
         else:
             print("Warning: No Q-table found for evaluation mode!")
             pygame.quit()
-            return
+            return None
 
     q_table_filename = os.path.basename(agent.q_table_path)
-    log_filename = q_table_filename.replace(".json", ".txt")
+    log_filename = os.path.splitext(q_table_filename)[0] + ".txt"
     logger = Logger(log_filename)
 
-    num_episodes = 1 if SESSION_SETTINGS["MANUAL_CONTROL"] else SESSION_SETTINGS["NUM_EPISODES"]
+    manual_control = SESSION_SETTINGS["MANUAL_CONTROL"] and not headless  # No keyboard without a window
+    num_episodes = 1 if manual_control else SESSION_SETTINGS["NUM_EPISODES"]
+    training = not manual_control and SESSION_SETTINGS["TRAINING_MODE"]
+    episode = start_training_run(agent, logger, num_episodes) if training else 0
+    # Progress saved with every Q-table snapshot, so the run can be resumed from it
+    run = {"episode": episode, "num_episodes": num_episodes, "completed": False,
+           "log_length": len(logger.episode_log)}
+    log_base = len(logger.episode_log) - episode
+    # Saves and log lines are written by a background thread, never by the simulation loop
+    writer = None
+    if training:
+        writer = CheckpointWriter(agent, logger, training_state=lambda: training_checkpoint.capture(agent, **run))
+    show_progress = False
+    scores = []
+    if training and SESSION_SETTINGS["LIVE_PLOT"]:
+        # Follows the episode log while this session appends to it
+        script_path = os.path.join("log_plots", "plot_progress.py")
+        subprocess.Popen([sys.executable, script_path, "--live", "--log", os.path.splitext(log_filename)[0]])
 
-    episode = 0
     while episode < num_episodes:
         print(f"Starting episode {episode + 1}/{num_episodes}")
-        car.reset()
-        score, window_closed, end_simulation, restart_episode = run_episode(
-            environment, car, agent, SESSION_SETTINGS["MANUAL_CONTROL"]
-        )
+        environment.clock.reset()
+        environment.profiler.start_episode()
+        episode_started = time.perf_counter()
+        if batch is not None:
+            batch.reset()
+            score, window_closed, end_simulation, restart_episode = run_batch_episode(environment, batch, agent)
+        else:
+            car.reset()
+            score, window_closed, end_simulation, restart_episode = run_episode(
+                environment, car, agent, manual_control
+            )
 
         if window_closed:
             print("Window closed. Ending session.")
@@ -108,30 +273,193 @@ def start_simulation(selected_track):
 
         if end_simulation:
             print("Simulation ended by user. Displaying progress graph...")
-            # Launch the plot_progress.py script in a new process
-            python_exe = sys.executable
-            script_path = os.path.join("log_plots", "plot_progress.py")
-            subprocess.Popen([python_exe, script_path])
+            show_progress = True
             break
 
         if restart_episode:
             print("Restarting episode by user request.")
             continue  # Do not increment episode, just restart
 
-        if not SESSION_SETTINGS["MANUAL_CONTROL"] and SESSION_SETTINGS["TRAINING_MODE"]:
-            agent.save_q_table()
-            logger.log_score(score)
+        if training:
+            started = environment.profiler.start()
+            metrics = episode_metrics(environment, car if batch is None else batch, agent,
+                                      time.perf_counter() - episode_started)
+            agent.end_episode()  # Per-episode exploration schedules decay here
+            run.update(episode=episode + 1, log_length=log_base + episode + 1)
+            writer.episode_finished(score, **metrics)
+            environment.profiler.record("save", started)
 
+        scores.append(score)
         mode = "Training" if SESSION_SETTINGS["TRAINING_MODE"] else "Evaluation"
         print(f"{mode} episode {episode + 1} completed. Score: {score}")
+        summary = environment.profiler.end_episode(
+            episode + 1, agent.model_size(), track=selected_track, score=score, headless=headless
+        )
+        if summary:
+            print(f"Profile: {format_summary(summary)}")
+
+        episode += 1
+
+    if writer:
+        if episode >= num_episodes:
+            run["completed"] = True
+            writer.save_q_table()  # Record the run as finished, so the next one starts afresh
+        writer.close()  # Flush pending saves and scores before anything reads them
+    if show_progress:
+        # Launch the plot_progress.py script in a new process
+        python_exe = sys.executable
+        script_path = os.path.join("log_plots", "plot_progress.py")
+        subprocess.Popen([python_exe, script_path, "--log", os.path.splitext(log_filename)[0]])
+    pygame.quit()
+    return session_summary(selected_track, training, scores, agent, completed=episode >= num_episodes)
+
+
+def session_summary(track, training, scores, agent, completed):
+    """What a session ran and how it went, for scripts that start sessions without the menu."""
+    return {
+        "track": track,
+        "mode": "training" if training else "evaluation",
+        "episodes": len(scores),
+        "completed": completed,
+        "scores": scores,
+        "mean_score": sum(scores) / len(scores) if scores else None,
+        "best_score": max(scores) if scores else None,
+        "model_path": agent.q_table_path,
+        "model_size": agent.model_size(),
+    }
+
+
+def run_comparison_episode(environment, cars, agents, labels):
+    """
+    Run one evaluation episode with several cars on the same track and window.
+    Cars that leave the track stop where they crashed; the episode ends when time
+    runs out or every car has crashed.
+    """
+    frame_clock = pygame.time.Clock()
+    window_closed = False
+    restart_episode = False
+    end_simulation = False
+    states = [agent.observe(car) for car, agent in zip(cars, agents)]
+    environment.renderer.invalidate()
+
+    while True:
+        frame_clock.tick(SESSION_SETTINGS["STEPS_PER_SECOND"]) # FPS
+
+        time_left = max(0, SESSION_SETTINGS["EPISODE_DURATION"] - environment.clock.time)
+        scores = [car.score for car in cars]
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                window_closed = True
+                return scores, window_closed, end_simulation, restart_episode
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_e:  # End simulation
+                    end_simulation = True
+                    return scores, window_closed, end_simulation, restart_episode
+                if event.key == pygame.K_r:  # Restart episode
+                    restart_episode = True
+                    return scores, window_closed, end_simulation, restart_episode
+
+        if time_left <= 0:
+            break
+
+        environment.clock.tick()
+        for idx, (car, agent) in enumerate(zip(cars, agents)):
+            if car.collided:
+                continue
+            action = agent.get_action(states[idx])
+            car.handle_agent_action(action)
+            car.calculate_reward()
+            states[idx] = agent.observe(car)
+
+        if all(car.collided for car in cars):
+            break
+
+        scoreboard = [(label, car.colour, car.score, car.collided) for label, car in zip(labels, cars)]
+        environment.renderer.draw_frame(cars, time_left, scoreboard)
+
+    return [car.score for car in cars], window_closed, end_simulation, restart_episode
+
+
+def make_comparison_cars(environment):
+    """
+    One car and agent per Q-table and seed, all on one Environment.
+    Cars of the same Q-table share its table; each car explores with its own seeded RNG.
+    """
+    q_tables_dir = os.path.join("q_learning_implementation", "q_tables")
+    filenames = COMPARISON_SETTINGS["Q_TABLES"] or [QL_SETTINGS["Q_TABLE_FILENAME"]]
+    seeds = COMPARISON_SETTINGS["SEEDS"] or [0]
+    colours = COMPARISON_SETTINGS["CAR_COLOURS"]
+
+    cars, agents, labels = [], [], []
+    for filename in filenames:
+        first_agent = None
+        for seed in seeds:
+            car = Car(environment, colour=colours[len(cars) % len(colours)])
+            agent = make_agent(car.state_encoder.feature_count, 4)
+            agent.q_table_path = os.path.join(q_tables_dir, filename)
+            if first_agent is None:
+                if not agent.load_q_table():
+                    print(f"Warning: No Q-table found at {agent.q_table_path}, skipping it.")
+                    break
+                first_agent = agent
+            agent.share_model(first_agent)
+            agent.exploration_rate = COMPARISON_SETTINGS["EXPLORATION_RATE"]
+            agent.rng = RandomStream(seed)
+            label = os.path.splitext(filename)[0]
+            cars.append(car)
+            agents.append(agent)
+            labels.append(f"{label} #{seed}" if len(seeds) > 1 else label)
+    return cars, agents, labels
+
+
+def start_comparison(selected_track):
+    """Evaluate several Q-tables (or seeds) side by side in one window."""
+    print(f"Starting comparison with track: {selected_track}")
+    pygame.display.quit()  # Close the menu window before starting simulation
+    pygame.display.init()
+    environment = Environment(selected_track)
+    cars, agents, labels = make_comparison_cars(environment)
+    if not cars:
+        print("Warning: No Q-tables to compare!")
+        pygame.quit()
+        return
+
+    num_episodes = SESSION_SETTINGS["NUM_EPISODES"]
+    all_scores = []
+    episode = 0
+    while episode < num_episodes:
+        print(f"Starting comparison episode {episode + 1}/{num_episodes}")
+        environment.clock.reset()
+        for car in cars:
+            car.reset()
+        scores, window_closed, end_simulation, restart_episode = run_comparison_episode(
+            environment, cars, agents, labels
+        )
+
+        if window_closed or end_simulation:
+            print("Comparison ended.")
+            break
+
+        if restart_episode:
+            print("Restarting episode by user request.")
+            continue
 
+        all_scores.append(scores)
+        print(f"Comparison episode {episode + 1} completed. Scores: " +
+              ", ".join(f"{label}: {score}" for label, score in zip(labels, scores)))
         episode += 1
 
+    if all_scores:
+        print(f"Mean scores over {len(all_scores)} episodes:")
+        for idx, label in enumerate(labels):
+            print(f"  {label}: {sum(scores[idx] for scores in all_scores) / len(all_scores):.1f}")
     pygame.quit()
 
 
 def main():
-    launch_menu(start_simulation)
+    from user_interface import launch_menu  # Keeps run_headless_episode importable without pygame_menu
+    launch_menu(start_simulation, start_comparison)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,72 +2,198 @@ import sys
 import os
 import json
 import numpy as np
-import random
-from collections import defaultdict
-import ast
+from functools import partial
 from simulation_settings import QL_SETTINGS
+from q_learning_implementation.q_table import QTable
+from q_learning_implementation.replay_buffer import ReplayBuffer
+from q_learning_implementation.exploration import ExplorationSchedule, RandomStream, epsilon_greedy
+from q_learning_implementation import q_table_store
 
 
+# Largest share of the table a journal may cover before the file is rewritten in full
+JOURNAL_FRACTION = 0.25
+
 
 class QLearningAgent:
     def __init__(self, state_size, action_size):
         self.state_size = state_size  # The number of possible states
         self.action_size = action_size  # The number of possible actions
-        self.q_table = defaultdict(self._default_q_values)  # Initialize Q-table with default values for unseen states
+        self.q_table = QTable(action_size)  # Unseen states read as zeros
         self.q_table_path = os.path.join("q_learning_implementation", "q_tables", QL_SETTINGS["Q_TABLE_FILENAME"])
         self.learning_rate = QL_SETTINGS["LEARNING_RATE"]  # Alpha
         self.discount_factor = QL_SETTINGS["DISCOUNT_FACTOR"]  # Gamma
-        self.exploration_rate = QL_SETTINGS["EXPLORATION_RATE"]  # Epsilon
-        self.exploration_decay = QL_SETTINGS["EXPLORATION_DECAY"]  # Epsilon decay
-        self.min_exploration_rate = QL_SETTINGS["MIN_EXPLORATION_RATE"]  # Minimum epsilon
+        self.exploration = ExplorationSchedule.from_settings()  # Epsilon over training
+        self.exploration_rate = self.exploration.rate  # Epsilon
+        self._stored_path = None  # Binary file whose rows line up with q_table
+        self._journal_rows = np.zeros(0, dtype=np.int64)  # Rows changed since that file was written in full
+        self.rng = RandomStream()  # Source of exploration randomness, e.g. a seeded RandomStream per car
+        self.replay = None  # Experience replay, off unless REPLAY_BUFFER_SIZE is set
+        if QL_SETTINGS["REPLAY_BUFFER_SIZE"]:
+            self.replay = ReplayBuffer(QL_SETTINGS["REPLAY_BUFFER_SIZE"], QL_SETTINGS["REPLAY_PRIORITISED"],
+                                       QL_SETTINGS["REPLAY_ALPHA"], QL_SETTINGS["REPLAY_BETA"])
+        self.replay_batch_size = QL_SETTINGS["REPLAY_BATCH_SIZE"]
+        self.replay_every = QL_SETTINGS["REPLAY_EVERY"]
+        self._steps_since_replay = 0
+
+    def _is_binary(self, path):
+        return path.endswith(".qtb")
 
     def load_q_table(self):
         """
-        Load the Q-table from a JSON file. 
-        Returns True if successful, False if the file does not exist.
+        Load the Q-table from a binary (.qtb) or JSON file.
+        A missing .qtb file falls back to a JSON file of the same name, which is
+        converted on the next save.
+        Returns True if successful, False if no file exists.
         """
-        if not os.path.exists(self.q_table_path):
+        path = self.q_table_path
+        legacy_path = os.path.splitext(path)[0] + ".json"
+        if os.path.exists(path) and self._is_binary(path):
+            self.q_table, self._journal_rows = q_table_store.load_with_journal(path)
+            self._stored_path = path
+        elif os.path.exists(path):
+            self.q_table = q_table_store.read_json(path, self.action_size)
+        elif self._is_binary(path) and os.path.exists(legacy_path):
+            print(f"Loading legacy Q-table {legacy_path}, it will be saved as {path}")
+            self.q_table = q_table_store.read_json(legacy_path, self.action_size)
+        else:
             return False
-        with open(self.q_table_path, "r") as f:
-            data = json.load(f)
-            self.q_table = defaultdict(self._default_q_values)
-            for state_str, actions_list in data.items():
-                state = ast.literal_eval(state_str)
-                self.q_table[state] = np.array(actions_list)
         return True
 
     def save_q_table(self):
-        """Save the Q-table to a JSON file."""
-        serializable_q_table = {str(state): actions.tolist() for state, actions in self.q_table.items()}
-        with open(self.q_table_path, "w") as f:
-            json.dump(serializable_q_table, f)
+        """Save the Q-table now, the same way a background snapshot would (see snapshot)."""
+        self.snapshot()()
+
+    def snapshot(self):
+        """
+        A call that writes the Q-table as it is now, for CheckpointWriter, which runs
+        these calls in order. Once a binary file lines up with the table, only the rows
+        changed since it was written are copied, into the file's journal. The file is
+        rewritten in full when it is new, when the journal would cover more than
+        JOURNAL_FRACTION of the table, and always for JSON files. Every write replaces
+        a whole file atomically, so a crash never leaves a torn table.
+        """
+        path, table = self.q_table_path, self.q_table
+        rows = np.union1d(self._journal_rows, table.dirty_rows())
+        if self._is_binary(path) and self._stored_path == path and len(rows) <= JOURNAL_FRACTION * table.size:
+            write = partial(q_table_store.write_journal, path, rows, table.keys[rows], table.values[rows], table.size)
+            self._journal_rows = rows
+        else:
+            keys, values = table.to_arrays()
+            write = partial(q_table_store.write_snapshot, path, keys, values)
+            self._stored_path = path if self._is_binary(path) else None
+            self._journal_rows = np.zeros(0, dtype=np.int64)
+        table.clear_dirty()
+        return write
+
+    def get_training_state(self):
+        """
+        Everything besides the Q-table that a resumed run needs to continue exactly:
+        (JSON-serialisable state, arrays), copied now.
+        """
+        state = {
+            "exploration": self.exploration.state(),
+            "rng": self.rng.get_state(),
+            "steps_since_replay": self._steps_since_replay,
+        }
+        arrays = {}
+        if self.replay is not None:
+            state["replay"], arrays = self.replay.get_state()
+        return state, arrays
+
+    def set_training_state(self, state, arrays):
+        self.exploration.set_state(state["exploration"])
+        self.exploration_rate = self.exploration.rate
+        self.rng.set_state(state["rng"])
+        self._steps_since_replay = state["steps_since_replay"]
+        if self.replay is not None and "replay" in state:
+            self.replay.set_state(state["replay"], arrays)
+
+    def observe(self, car):
+        """State of a car as this agent sees it: the packed state ID."""
+        return car.get_state_id()
 
-    def _default_q_values(self):
-        return np.zeros(self.action_size)
+    def model_size(self):
+        """States in the Q-table."""
+        return len(self.q_table)
+
+    def share_model(self, other):
+        """Learn into and act from another agent's Q-table."""
+        self.q_table = other.q_table
 
 # Get an action based on the current state using epsilon-greedy strategy.
     def get_action(self, state, use_epsilon=True):
         """Choose an action based on the current state using epsilon-greedy strategy."""
-        if len(state) != self.state_size:
+        if isinstance(state, tuple) and len(state) != self.state_size:
             print(f"Warning: State has {len(state)} variables, but state_size is {self.state_size}")
     
         # Use epsilon-greedy only when use_epsilon is True (learning mode)
-        if use_epsilon and random.uniform(0, 1) < self.exploration_rate:
-            return random.randint(0, self.action_size - 1)
+        if use_epsilon and self.rng.uniform(0, 1) < self.exploration_rate:
+            return self.rng.randint(0, self.action_size - 1)
         else:
-            return np.argmax(self.q_table[state])
+            return self.q_table.best_action(state)
+
+    def get_actions(self, state_ids, use_epsilon=True):
+        """
+        Epsilon-greedy actions for an array of packed state IDs at once, e.g. from
+        CarBatch.get_state_ids. Unseen states read as zeros and are not added.
+        """
+        rows = self.q_table.find_many(state_ids)
+        q_values = np.where((rows >= 0)[:, None], self.q_table.values[np.maximum(rows, 0)], 0)
+        return epsilon_greedy(q_values, self.exploration_rate if use_epsilon else 0, self.rng)
 
     def update_q_value(self, state, action, reward, next_state):
         """
         Bellman Equation update for Q-learning:
         Q[state][action] = Q[state][action] + alpha * (reward + gamma * max(Q[next_state]) - Q[state][action])
         """
-        alpha = self.learning_rate
-        gamma = self.discount_factor
-        Q = self.q_table
-        max_next_q = np.max(Q[next_state])
-        Q[state][action] = Q[state][action] + alpha * (reward + gamma * max_next_q - Q[state][action])
+        self.q_table.update(state, action, reward, next_state, self.learning_rate, self.discount_factor)
+        if self.replay is not None:
+            self.replay.add(self.q_table.key(state), action, reward, self.q_table.key(next_state))
+            self._steps_since_replay += 1
+            if self.replay_every and self._steps_since_replay >= self.replay_every:
+                self.replay_update()
+
+    def update_q_values(self, states, actions, rewards, next_states):
+        """
+        Bellman update of one transition per car, as arrays of packed state IDs from
+        CarBatch.get_state_ids. Unseen states are added first, as update_q_value adds
+        them; repeats of a state-action pair get the mean of their updates.
+        """
+        keys = np.concatenate((states, next_states))
+        for key in np.unique(keys[self.q_table.find_many(keys) < 0]).tolist():
+            self.q_table.row(key)
+        self._update_batch(states, actions, rewards, next_states)
+        if self.replay is not None:
+            for transition in zip(states.tolist(), actions.tolist(), rewards.tolist(), next_states.tolist()):
+                self.replay.add(*transition)
+            self._steps_since_replay += len(states)
+            if self.replay_every and self._steps_since_replay >= self.replay_every:
+                self.replay_update()
+
+    def replay_update(self, batch_size=None, batches=1):
+        """
+        Apply batched updates from transitions sampled out of the replay buffer.
+        Runs every REPLAY_EVERY steps from update_q_value, and can also be called on its
+        own, e.g. between episodes, to learn more from the steps already simulated.
+        """
+        self._steps_since_replay = 0
+        batch_size = batch_size or self.replay_batch_size
+        if self.replay is None or len(self.replay) < batch_size:
+            return
+        for _ in range(batches):
+            indices, states, actions, rewards, next_states, weights = self.replay.sample(batch_size)
+            td_errors = self._update_batch(states, actions, rewards, next_states, weights)
+            self.replay.update_priorities(indices, td_errors)
+
+    def _update_batch(self, states, actions, rewards, next_states, weights=None):
+        """Batched Bellman update of packed-key transitions; returns their TD errors."""
+        return self.q_table.update_batch(states, actions, rewards, next_states,
+                                         self.learning_rate, self.discount_factor, weights)
 
     def decay_exploration(self):
-        """decay exploration rate (epsilon) over time"""
-        self.exploration_rate = max(self.min_exploration_rate, self.exploration_rate * self.exploration_decay)
+        """Report a training step to the exploration schedule; only per-step schedules decay here."""
+        self.exploration_rate = self.exploration.on_step()
+
+    def end_episode(self):
+        """Report a finished training episode to the exploration schedule."""
+        self.exploration_rate = self.exploration.on_episode()
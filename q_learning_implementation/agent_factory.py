@@ -0,0 +1,36 @@
+import os
+from simulation_settings import QL_SETTINGS, TILE_CODING_SETTINGS
+from q_learning_implementation.agent import QLearningAgent
+from q_learning_implementation.tile_coding_agent import TileCodingAgent
+
+# Agents with the same interface: observe, get_action, update_q_value,
+# decay_exploration, end_episode, load_q_table, save_q_table, snapshot, model_size,
+# share_model, get_training_state, set_training_state. Backends that can also drive a
+# CarBatch have get_actions and update_q_values.
+AGENT_BACKENDS = {
+    "q_table": QLearningAgent,
+    "tile_coding": TileCodingAgent,
+}
+
+# Settings dict and key of each backend's model file name
+MODEL_FILENAMES = {
+    "q_table": (QL_SETTINGS, "Q_TABLE_FILENAME"),
+    "tile_coding": (TILE_CODING_SETTINGS, "WEIGHTS_FILENAME"),
+}
+
+
+def make_agent(state_size, action_size, backend=None):
+    """Agent of the given backend, QL_SETTINGS["AGENT_BACKEND"] by default."""
+    backend = backend or QL_SETTINGS["AGENT_BACKEND"]
+    if backend not in AGENT_BACKENDS:
+        raise ValueError(f"Unknown agent backend {backend!r}, expected one of {', '.join(AGENT_BACKENDS)}")
+    return AGENT_BACKENDS[backend](state_size, action_size)
+
+
+def log_name(backend=None):
+    """
+    Name of the training log of the backend's model, as plot_progress.py --log takes
+    it: the model file name without its extension.
+    """
+    settings, key = MODEL_FILENAMES[backend or QL_SETTINGS["AGENT_BACKEND"]]
+    return os.path.splitext(os.path.basename(settings[key]))[0]
@@ -0,0 +1,167 @@
+import math
+import random
+import numpy as np
+from simulation_settings import QL_SETTINGS
+
+SHAPES = ("exponential", "linear", "cosine")
+UNITS = ("episode", "step")
+
+
+class ExplorationSchedule:
+    """
+    Exploration rate (epsilon) as a function of training progress.
+    The unit says what the schedule counts, episodes or simulation steps, and the
+    shape how epsilon falls from start to end:
+      exponential  start * decay ** t, floored at end
+      linear       straight from start to end over duration units
+      cosine       half a cosine from start to end over duration units
+    Agents report every step and every episode; only events of the schedule's unit
+    move it, so a per-episode schedule is unaffected by the frame rate.
+    """
+    def __init__(self, start=1.0, end=0.1, shape="exponential", unit="episode", decay=0.995, duration=500):
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown exploration schedule shape {shape!r}, expected one of {', '.join(SHAPES)}")
+        if unit not in UNITS:
+            raise ValueError(f"Unknown exploration schedule unit {unit!r}, expected one of {', '.join(UNITS)}")
+        self.start = start
+        self.end = end
+        self.shape = shape
+        self.unit = unit
+        self.decay = decay
+        self.duration = max(duration, 1)
+        self.steps = 0
+        self.episodes = 0
+        self.rate = self.rate_at(0)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(QL_SETTINGS["EXPLORATION_RATE"], QL_SETTINGS["MIN_EXPLORATION_RATE"],
+                   QL_SETTINGS["EXPLORATION_SCHEDULE"], QL_SETTINGS["EXPLORATION_UNIT"],
+                   QL_SETTINGS["EXPLORATION_DECAY"], QL_SETTINGS["EXPLORATION_DURATION"])
+
+    def rate_at(self, t):
+        """Epsilon after t units."""
+        if self.shape == "exponential":
+            rate = self.start * self.decay ** t
+        else:
+            progress = min(t / self.duration, 1.0)
+            if self.shape == "cosine":
+                progress = 0.5 * (1 - math.cos(math.pi * progress))
+            rate = self.start + (self.end - self.start) * progress
+        return max(rate, min(self.end, self.start))
+
+    def rates(self, t):
+        """rate_at for an array of unit counts, for plotting."""
+        t = np.asarray(t, dtype=np.float64)
+        if self.shape == "exponential":
+            rates = self.start * self.decay ** t
+        else:
+            progress = np.clip(t / self.duration, 0.0, 1.0)
+            if self.shape == "cosine":
+                progress = 0.5 * (1 - np.cos(math.pi * progress))
+            rates = self.start + (self.end - self.start) * progress
+        return np.maximum(rates, min(self.end, self.start))
+
+    def units_to_end(self):
+        """Units until epsilon reaches its end value."""
+        if self.start <= self.end:
+            return 0
+        if self.shape != "exponential":
+            return self.duration
+        if self.end <= 0 or self.decay >= 1:
+            return math.inf
+        return math.ceil(math.log(self.end / self.start) / math.log(self.decay))
+
+    @property
+    def elapsed(self):
+        return self.episodes if self.unit == "episode" else self.steps
+
+    def on_step(self):
+        self.steps += 1
+        if self.unit == "step":
+            self.rate = self.rate_at(self.steps)
+        return self.rate
+
+    def on_episode(self):
+        self.episodes += 1
+        if self.unit == "episode":
+            self.rate = self.rate_at(self.episodes)
+        return self.rate
+
+    def state(self):
+        return {"steps": self.steps, "episodes": self.episodes}
+
+    def set_state(self, state):
+        self.steps, self.episodes = int(state["steps"]), int(state["episodes"])
+        self.rate = self.rate_at(self.elapsed)
+
+
+class RandomStream:
+    """
+    Uniform random numbers drawn from NumPy in blocks and handed out one at a time.
+    Has the uniform and randint methods agents use from the random module, at a
+    fraction of their cost, and draws whole arrays for batches of cars.
+    Without a seed it seeds itself from the random module, so random.seed still
+    makes a run repeatable.
+    """
+    def __init__(self, seed=None, block_size=4096):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        self._block = []
+        self._block_state = None  # Generator state the current block was drawn from
+        self._index = 0
+
+    def random(self):
+        index = self._index
+        if index == len(self._block):
+            self._block_state = self.generator.bit_generator.state
+            self._block = self.generator.random(self.block_size).tolist()
+            index = 0
+        self._index = index + 1
+        return self._block[index]
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def randint(self, a, b):
+        """Random integer in [a, b], both included, like random.randint."""
+        return a + int(self.random() * (b - a + 1))
+
+    def get_state(self):
+        """JSON-serialisable state, from which set_state continues the exact same stream."""
+        return {
+            "generator": self.generator.bit_generator.state,
+            "block_state": self._block_state,
+            "block_size": len(self._block),
+            "index": self._index,
+        }
+
+    def set_state(self, state):
+        self._block, self._index, self._block_state = [], 0, state["block_state"]
+        if state["block_state"] is not None:
+            # Draw the current block again instead of storing it
+            self.generator.bit_generator.state = state["block_state"]
+            self._block = self.generator.random(state["block_size"]).tolist()
+            self._index = state["index"]
+        self.generator.bit_generator.state = state["generator"]
+
+    def randoms(self, n):
+        return self.generator.random(n)
+
+    def integers(self, high, n):
+        return self.generator.integers(0, high, n)
+
+
+def epsilon_greedy(q_values, epsilon, stream):
+    """
+    Actions for a batch of states from their (n, action_size) Q-values: the best
+    action of each row, or a random one with probability epsilon.
+    """
+    q_values = np.asarray(q_values)
+    actions = q_values.argmax(axis=1)
+    if epsilon > 0:
+        explore = stream.randoms(len(actions)) < epsilon
+        actions[explore] = stream.integers(q_values.shape[1], int(explore.sum()))
+    return actions
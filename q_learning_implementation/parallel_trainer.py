@@ -0,0 +1,217 @@
+import os
+import sys
+import random
+import multiprocessing
+from collections import defaultdict
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_settings import (SESSION_SETTINGS, QL_SETTINGS, CAR_SETTINGS, STATE_SETTINGS, TRACK_SETTINGS,
+                                 WINDOW_SETTINGS, COLOUR_SETTINGS, PARALLEL_SETTINGS)
+from q_learning_implementation.agent import QLearningAgent
+from q_learning_implementation.q_table import QTable
+from q_learning_implementation import training_checkpoint
+from simulation.state_encoder import StateEncoder
+from simulation.track_cache import load_track
+from q_learning_logs.logger import Logger
+from q_learning_logs.checkpoint_writer import CheckpointWriter
+
+TRACKS_DIR = "tracks"
+
+# Every settings dict the episode path reads; spawned workers do not inherit the
+# coordinator's changes to them, so each job carries a copy
+WORKER_SETTINGS = (SESSION_SETTINGS, QL_SETTINGS, CAR_SETTINGS, STATE_SETTINGS, TRACK_SETTINGS,
+                   WINDOW_SETTINGS, COLOUR_SETTINGS)
+
+# Per-process cache so a worker builds each track's Environment and Car only once
+_worker_cars = {}
+
+
+class _VisitCountingAgent(QLearningAgent):
+    """QLearningAgent that counts how often each state-action pair was updated."""
+    def __init__(self, state_size, action_size):
+        super().__init__(state_size, action_size)
+        self.visits = defaultdict(self._default_visits)  # Packed state key -> visits per action
+
+    def _default_visits(self):
+        return np.zeros(self.action_size, dtype=np.int64)
+
+    def update_q_value(self, state, action, reward, next_state):
+        super().update_q_value(state, action, reward, next_state)
+        self.visits[self.q_table.key(state)][action] += 1
+
+    def _update_batch(self, states, actions, rewards, next_states, weights=None):
+        td_errors = super()._update_batch(states, actions, rewards, next_states, weights)
+        # Only transitions whose states are both in the table were applied
+        applied = (self.q_table.find_many(states) >= 0) & (self.q_table.find_many(next_states) >= 0)
+        for key, action in zip(np.asarray(states)[applied].tolist(), np.asarray(actions)[applied].tolist()):
+            self.visits[key][action] += 1
+        return td_errors
+
+
+def _get_worker_car(track):
+    if track not in _worker_cars:
+        from simulation.environment import Environment
+        from simulation.car import Car
+        environment = Environment(track, headless=True)
+        _worker_cars[track] = (environment, Car(environment))
+    return _worker_cars[track]
+
+
+def _train_round(job):
+    """
+    Run one round of episodes in a worker process.
+    Returns the Q-value deltas and visit counts of every updated state-action pair,
+    and the metrics of each episode.
+    """
+    import time
+    from main import run_headless_episode, episode_metrics
+
+    for settings, values in zip(WORKER_SETTINGS, job["settings"]):
+        settings.update(values)
+
+    environment, car = _get_worker_car(job["track"])
+    agent = _VisitCountingAgent(job["state_size"], job["action_size"])
+    training_checkpoint.seed_agent(agent, job["seed"])
+    agent.exploration.set_state(job["exploration"])
+    agent.exploration_rate = agent.exploration.rate
+    snapshot_keys, snapshot_values = job["q_table"]
+    agent.q_table = QTable.from_arrays(snapshot_keys, snapshot_values)
+
+    episodes = []
+    for _ in range(job["episodes"]):
+        environment.clock.reset()
+        car.reset()
+        started = time.perf_counter()
+        score, _, _, _ = run_headless_episode(environment, car, agent)
+        episodes.append(dict(episode_metrics(environment, car, agent, time.perf_counter() - started), score=score))
+        agent.end_episode()
+
+    keys = np.array(list(agent.visits.keys()), dtype=np.uint64)
+    visits = np.array(list(agent.visits.values()), dtype=np.int64).reshape(len(keys), agent.action_size)
+    rows = agent.q_table.find_many(keys)
+    before = np.zeros((len(keys), agent.action_size), dtype=np.float32)
+    in_snapshot = rows < len(snapshot_keys)  # Rows are appended, so older rows came from the snapshot
+    before[in_snapshot] = snapshot_values[rows[in_snapshot]]
+    deltas = agent.q_table.values[rows] - before
+    return (keys, deltas, visits), episodes, agent.exploration.state()
+
+
+class ParallelTrainer:
+    """
+    Trains one master Q-table with several worker processes.
+    Every round each worker runs SYNC_INTERVAL headless episodes from a copy of the
+    master table, and the coordinator merges their updates, weighted by how often each
+    worker visited each state-action pair, before rebroadcasting the merged table.
+    """
+    def __init__(self, tracks=None, num_workers=None, sync_interval=None, state_size=None, action_size=4):
+        self.num_workers = num_workers or PARALLEL_SETTINGS["NUM_WORKERS"]
+        self.sync_interval = sync_interval or PARALLEL_SETTINGS["SYNC_INTERVAL"]
+        self.tracks = tracks or PARALLEL_SETTINGS["TRACKS"] or sorted(
+            f for f in os.listdir(TRACKS_DIR) if f.endswith(".png")
+        )
+        if state_size is None:
+            state_size = StateEncoder().feature_count
+        self.agent = QLearningAgent(state_size, action_size)  # Holds the master table
+        self.scores = []
+        self.episode = 0  # Episodes of the run done so far, including any before a resume
+        self.seed = None  # Worker seeds are drawn from this plus the episode they start at
+
+    def _make_jobs(self, episodes_per_worker):
+        snapshot = self.agent.q_table.to_arrays()
+        settings = tuple(dict(settings) for settings in WORKER_SETTINGS)
+        return [{
+            "track": self.tracks[worker % len(self.tracks)],
+            "episodes": episodes_per_worker[worker],
+            "q_table": snapshot,
+            "exploration": self.agent.exploration.state(),
+            "state_size": self.agent.state_size,
+            "action_size": self.agent.action_size,
+            "settings": settings,
+            "seed": self.seed + self.episode + worker,
+        } for worker in range(self.num_workers) if episodes_per_worker[worker] > 0]
+
+    def merge(self, results):
+        """Apply the visit-weighted average of the workers' deltas to the master table."""
+        table = self.agent.q_table
+        for (keys, _, _), _, _ in results:
+            for key in keys.tolist():
+                table.row(key)  # Add states first seen by a worker
+
+        weighted_deltas = np.zeros((len(table), table.action_size))
+        total_visits = np.zeros((len(table), table.action_size))
+        for (keys, deltas, visits), _, _ in results:
+            rows = table.find_many(keys)
+            np.add.at(weighted_deltas, rows, deltas * visits)
+            np.add.at(total_visits, rows, visits)
+
+        merged = np.divide(weighted_deltas, total_visits, out=np.zeros_like(weighted_deltas), where=total_visits > 0)
+        table.values[:len(table)] += merged.astype(np.float32)
+        table.mark_dirty(np.flatnonzero(total_visits.any(axis=1)))
+
+        # The schedule moves by every step and episode any worker ran this round
+        exploration = self.agent.exploration
+        before = exploration.state()
+        exploration.set_state({
+            counter: before[counter] + sum(state[counter] - before[counter] for _, _, state in results)
+            for counter in before
+        })
+        self.agent.exploration_rate = exploration.rate
+
+    def train(self, num_episodes, logger=None):
+        """
+        Run num_episodes episodes spread over the workers and return the scores of those
+        run now. Like a single-process run, an interrupted run is resumed from its
+        checkpoint and SEED makes the run repeatable (see main.start_training_run).
+        """
+        from main import start_training_run
+
+        self.agent.load_q_table()
+        self.episode = start_training_run(self.agent, logger, num_episodes)
+        # Seeds follow the episode count, so a resumed run carries on where it stopped
+        self.seed = SESSION_SETTINGS["SEED"] if SESSION_SETTINGS["SEED"] is not None else random.getrandbits(32)
+        episodes_per_round = self.num_workers * self.sync_interval
+        round_index = 0
+        log_length = len(logger.episode_log) if logger is not None else 0
+        run = {"episode": self.episode, "num_episodes": num_episodes, "completed": False, "log_length": log_length}
+        log_base = log_length - self.episode
+        writer = CheckpointWriter(self.agent, logger,
+                                  training_state=lambda: training_checkpoint.capture(self.agent, **run))
+        for track in set(self.tracks):
+            # Compile each track once here, rather than in every worker at the same time
+            load_track(os.path.join(TRACKS_DIR, track), with_distance_field=TRACK_SETTINGS["DISTANCE_FIELD"])
+        with multiprocessing.Pool(self.num_workers) as pool:
+            while self.episode < num_episodes:
+                remaining = min(episodes_per_round, num_episodes - self.episode)
+                episodes_per_worker = [
+                    remaining // self.num_workers + (1 if worker < remaining % self.num_workers else 0)
+                    for worker in range(self.num_workers)
+                ]
+                results = pool.map(_train_round, self._make_jobs(episodes_per_worker))
+                self.merge(results)
+
+                for _, episodes, _ in results:
+                    for metrics in episodes:
+                        self.scores.append(metrics["score"])
+                        writer.log_episode(metrics)
+                self.episode += remaining
+                run.update(episode=self.episode, log_length=log_base + self.episode,
+                           completed=self.episode >= num_episodes)
+                writer.save_q_table()
+                round_index += 1
+                print(f"Round {round_index}: {self.episode}/{num_episodes} episodes, "
+                      f"mean score {np.mean(self.scores[-remaining:]):.1f}, "
+                      f"{len(self.agent.q_table)} states")
+        writer.close()
+        return self.scores
+
+
+def main():
+    trainer = ParallelTrainer()
+    log_filename = os.path.splitext(os.path.basename(trainer.agent.q_table_path))[0] + ".txt"
+    trainer.train(SESSION_SETTINGS["NUM_EPISODES"], logger=Logger(log_filename))
+
+
+if __name__ == "__main__":
+    main()
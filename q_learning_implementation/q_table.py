@@ -0,0 +1,249 @@
+import numpy as np
+
+# States are packed into one integer: a 4-bit length tag followed by 6 bits per feature
+FEATURE_BITS = 6
+FEATURE_OFFSET = 32  # Feature values from -32 to 31 fit in a field
+MAX_FEATURES = 10    # 4 + 10 * 6 bits still fit in a uint64
+
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15  # Fibonacci hashing
+_MASK64 = (1 << 64) - 1
+_EMPTY = -1
+
+
+def pack_state(state):
+    """Pack a discretised state tuple of ints, as returned by Car.get_state, into one integer."""
+    if len(state) > MAX_FEATURES:
+        raise ValueError(f"States have at most {MAX_FEATURES} features, got {len(state)}")
+    if min(state) < -FEATURE_OFFSET or max(state) >= FEATURE_OFFSET:
+        raise ValueError(f"State {state} has values outside the packable range")
+    key = len(state)
+    for value in state:
+        key = (key << FEATURE_BITS) | (value + FEATURE_OFFSET)
+    return key
+
+
+def unpack_state(key):
+    """Inverse of pack_state."""
+    key = int(key)
+    length = next(n for n in range(1, MAX_FEATURES + 1) if key >> (FEATURE_BITS * n) == n)
+    mask = (1 << FEATURE_BITS) - 1
+    return tuple(
+        ((key >> (FEATURE_BITS * (length - 1 - i))) & mask) - FEATURE_OFFSET for i in range(length)
+    )
+
+
+class QTable:
+    """
+    Q-values of every visited state in one contiguous float32 (n_states, action_size) array.
+    States are packed into integer keys and found through an open-addressing hash index
+    held in NumPy arrays, so a state costs about 32 bytes instead of a dict entry,
+    a tuple and a small ndarray. Unseen states read as zeros, like the old defaultdict.
+    """
+    def __init__(self, action_size, capacity=1024):
+        self.action_size = action_size
+        self.size = 0
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.values = np.zeros((capacity, action_size), dtype=np.float32)
+        self.dirty = np.zeros(capacity, dtype=bool)  # Rows changed since the last save
+        self._resize_index(2 * capacity)
+        # Rows never move, so the last lookup can be reused: a step's next state
+        # is the following step's state
+        self._last_key = None
+        self._last_row = _EMPTY
+
+    @classmethod
+    def from_arrays(cls, keys, values):
+        """Build a table from packed keys and their (n, action_size) values."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        table = cls(values.shape[1], capacity=max(1024, len(keys)))
+        table.keys[:len(keys)] = keys
+        table.values[:len(keys)] = values
+        table.size = len(keys)
+        table._resize_index(len(table.slots))
+        return table
+
+    def mark_dirty(self, rows):
+        self.dirty[rows] = True
+
+    def clear_dirty(self):
+        self.dirty[:] = False
+
+    def dirty_rows(self):
+        return np.flatnonzero(self.dirty[:self.size])
+
+    def to_arrays(self):
+        """Copies of the packed keys and values of every stored state."""
+        return self.keys[:self.size].copy(), self.values[:self.size].copy()
+
+    @staticmethod
+    def key(state):
+        """Packed key of a state tuple; packed integers pass through."""
+        if isinstance(state, (int, np.integer)):
+            return int(state)
+        return pack_state(state)
+
+    def _slot(self, key):
+        return ((key * _HASH_MULTIPLIER) & _MASK64) >> self._shift
+
+    def _resize_index(self, n_slots):
+        """Rebuild the hash index with n_slots slots (a power of two)."""
+        n_slots = 1 << max(4, int(n_slots - 1).bit_length())
+        self._shift = 64 - (n_slots.bit_length() - 1)
+        self._slot_mask = n_slots - 1
+        slots = np.full(n_slots, _EMPTY, dtype=np.int32)
+
+        rows = np.arange(self.size, dtype=np.int32)
+        positions = self._slots_of(self.keys[:self.size])
+        # Linear probing, resolved for all rows at once: each round places the first
+        # row aimed at every free slot and moves the others one slot further
+        while rows.size:
+            free = slots[positions] == _EMPTY
+            free_index = np.flatnonzero(free)
+            targets, first = np.unique(positions[free_index], return_index=True)
+            slots[targets] = rows[free_index[first]]
+            placed = np.zeros(rows.size, dtype=bool)
+            placed[free_index[first]] = True
+            rows = rows[~placed]
+            positions = (positions[~placed] + 1) & self._slot_mask
+        self.slots = slots
+
+    def _slots_of(self, keys):
+        with np.errstate(over="ignore"):
+            hashed = keys.astype(np.uint64) * np.uint64(_HASH_MULTIPLIER)
+        return (hashed >> np.uint64(self._shift)).astype(np.int64)
+
+    def find(self, state):
+        """Row of a state, or -1 if it has never been stored."""
+        key = self.key(state)
+        slot = self._slot(key)
+        slots, keys = self.slots, self.keys
+        while True:
+            row = int(slots[slot])
+            if row == _EMPTY or int(keys[row]) == key:
+                return row
+            slot = (slot + 1) & self._slot_mask
+
+    def find_many(self, keys):
+        """Vectorised find for an array of packed keys."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        rows = np.full(keys.shape, _EMPTY, dtype=np.int64)
+        positions = self._slots_of(keys)
+        pending = np.arange(keys.size)
+        flat_keys = keys.ravel()
+        flat_rows = rows.reshape(-1)
+        positions = positions.ravel()
+        while pending.size:
+            candidates = self.slots[positions]
+            empty = candidates == _EMPTY
+            match = ~empty & (self.keys[np.maximum(candidates, 0)] == flat_keys[pending])
+            flat_rows[pending[match]] = candidates[match]
+            unresolved = ~(empty | match)
+            pending = pending[unresolved]
+            positions = (positions[unresolved] + 1) & self._slot_mask
+        return rows
+
+    def row(self, state):
+        """Row of a state, adding a zero row for states seen for the first time."""
+        key = self.key(state)
+        if key == self._last_key:
+            return self._last_row
+        slot = self._slot(key)
+        slots, keys = self.slots, self.keys
+        while True:
+            row = int(slots[slot])
+            if row == _EMPTY:
+                row = self._insert(key, slot)
+                break
+            if int(keys[row]) == key:
+                break
+            slot = (slot + 1) & self._slot_mask
+        self._last_key, self._last_row = key, row
+        return row
+
+    def _grow(self, capacity):
+        keys = np.zeros(capacity, dtype=np.uint64)
+        values = np.zeros((capacity, self.action_size), dtype=np.float32)
+        dirty = np.zeros(capacity, dtype=bool)
+        keys[:self.size] = self.keys[:self.size]
+        values[:self.size] = self.values[:self.size]
+        dirty[:self.size] = self.dirty[:self.size]
+        self.keys, self.values, self.dirty = keys, values, dirty
+
+    def _insert(self, key, slot):
+        if self.size == len(self.keys):
+            self._grow(2 * len(self.keys))
+        row = self.size
+        self.keys[row] = key
+        self.values[row] = 0
+        self.dirty[row] = True
+        self.size += 1
+        if 2 * self.size > len(self.slots):
+            self._resize_index(2 * len(self.slots))  # Keep the load factor under one half
+        else:
+            self.slots[slot] = row
+        return row
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, state):
+        return self.find(state) != _EMPTY
+
+    def __getitem__(self, state):
+        row = self.row(state)  # May grow self.values, so look it up first
+        return self.values[row]
+
+    def __setitem__(self, state, values):
+        row = self.row(state)
+        self.values[row] = values
+        self.dirty[row] = True
+
+    def items(self):
+        """(state tuple, values) pairs in insertion order."""
+        for row in range(self.size):
+            yield unpack_state(self.keys[row]), self.values[row]
+
+    def best_action(self, state):
+        row = self.row(state)  # May grow self.values, so look it up first
+        return int(self.values[row].argmax())
+
+    def update(self, state, action, reward, next_state, alpha, gamma):
+        """In-place Bellman update of one state-action value."""
+        row = self.row(state)
+        next_row = self.row(next_state)
+        values = self.values
+        q = float(values[row, action])
+        max_next_q = float(values[next_row].max())
+        values[row, action] = q + alpha * (reward + gamma * max_next_q - q)
+        self.dirty[row] = True
+
+    def update_batch(self, states, actions, rewards, next_states, alpha, gamma, weights=None):
+        """
+        Vectorised Bellman update of a batch of transitions, given as packed keys.
+        Every update reads the values from before the batch; repeats of a state-action
+        pair get the mean of their updates, so a batch never overshoots its targets.
+        Transitions with states not in the table are skipped. Returns the TD errors
+        (zero for skipped transitions).
+        """
+        rows = self.find_many(states)
+        next_rows = self.find_many(next_states)
+        actions = np.asarray(actions, dtype=np.int64)
+        valid = (rows != _EMPTY) & (next_rows != _EMPTY)
+        td_errors = np.zeros(len(rows), dtype=np.float64)
+        if not valid.any():
+            return td_errors
+
+        rows, next_rows, actions = rows[valid], next_rows[valid], actions[valid]
+        values = self.values
+        targets = np.asarray(rewards, dtype=np.float64)[valid] + gamma * values[next_rows].max(axis=1)
+        td_errors[valid] = targets - values[rows, actions]
+        steps = alpha * td_errors[valid]
+        if weights is not None:
+            steps *= np.asarray(weights)[valid]
+
+        cells, inverse, counts = np.unique(rows * self.action_size + actions, return_inverse=True, return_counts=True)
+        mean_steps = np.bincount(inverse, weights=steps, minlength=len(cells)) / counts
+        flat = values.reshape(-1)
+        flat[cells] += mean_steps.astype(np.float32)
+        self.dirty[cells // self.action_size] = True
+        return td_errors
@@ -0,0 +1,212 @@
+import os
+import sys
+import ast
+import json
+import struct
+import argparse
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from q_learning_implementation.q_table import QTable, pack_state, unpack_state
+
+# Binary Q-table file layout:
+#   64-byte header: magic, version, action_size, capacity, count, file_id
+#   capacity packed state keys (uint64)
+#   capacity x action_size Q-values (float32)
+# Rows up to count are valid. file_id is random per write (0 in files written
+# before it existed) and ties a journal to the file it was written against.
+#
+# Saves between full writes go to a journal next to the file (path + ".journal"):
+#   64-byte header: magic, version, action_size, count, file_id, n_rows
+#   n_rows row numbers (int64), their keys (uint64) and their values (float32)
+# A journal holds every row changed since the file was written, so each one
+# replaces the last. Both files are only ever replaced whole (temp file, fsync,
+# rename), so a crash leaves the previous save, never a torn one. load() applies
+# the journal when its file_id matches the file's.
+MAGIC = b"QTBL"
+JOURNAL_MAGIC = b"QTBJ"
+VERSION = 1
+HEADER = struct.Struct("<4sIIQQQ")
+JOURNAL_HEADER = struct.Struct("<4sIIQQQ")
+HEADER_SIZE = 64
+
+
+def journal_path(path):
+    return path + ".journal"
+
+
+def _values_offset(capacity):
+    return HEADER_SIZE + capacity * np.dtype(np.uint64).itemsize
+
+
+def _file_size(capacity, action_size):
+    return _values_offset(capacity) + capacity * action_size * np.dtype(np.float32).itemsize
+
+
+def _replace(path, write):
+    """Run write(f) on a temporary file, fsync it and rename it over path."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, version, action_size, capacity, count, file_id = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a binary Q-table file")
+    if version != VERSION:
+        raise ValueError(f"{path} has unsupported Q-table format version {version}")
+    return {"action_size": action_size, "capacity": capacity, "count": count, "file_id": file_id}
+
+
+def open_arrays(path, mode="r"):
+    """
+    Memory-map the keys and values of a binary Q-table without copying them.
+    Returns (header, keys, values) with arrays covering only the valid rows.
+    The journal, if any, is not applied; load() applies it.
+    """
+    header = read_header(path)
+    capacity, count = header["capacity"], header["count"]
+    if count == 0:
+        return header, np.zeros(0, dtype=np.uint64), np.zeros((0, header["action_size"]), dtype=np.float32)
+    keys = np.memmap(path, dtype=np.uint64, mode=mode, offset=HEADER_SIZE, shape=(count,))
+    values = np.memmap(path, dtype=np.float32, mode=mode, offset=_values_offset(capacity),
+                       shape=(count, header["action_size"]))
+    return header, keys, values
+
+
+def read_journal(path, header):
+    """(count, rows, keys, values) of the journal written against the file with header, or None."""
+    try:
+        with open(journal_path(path), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    magic, version, action_size, count, file_id, n_rows = JOURNAL_HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC or version != VERSION:
+        raise ValueError(f"{journal_path(path)} is not a Q-table journal")
+    if file_id != header["file_id"] or action_size != header["action_size"]:
+        return None  # Left over from before the file was last written in full
+    offset = HEADER_SIZE
+    rows = np.frombuffer(data, dtype=np.int64, count=n_rows, offset=offset)
+    offset += rows.nbytes
+    keys = np.frombuffer(data, dtype=np.uint64, count=n_rows, offset=offset)
+    offset += keys.nbytes
+    values = np.frombuffer(data, dtype=np.float32, count=n_rows * action_size, offset=offset)
+    return count, rows, keys, values.reshape(n_rows, action_size)
+
+
+def load(path):
+    """Load a binary Q-table, and its journal if it has one, into a QTable."""
+    return load_with_journal(path)[0]
+
+
+def load_with_journal(path):
+    """(QTable, rows the journal changed), so later journals can carry those rows on."""
+    header, keys, values = open_arrays(path)
+    journal = read_journal(path, header)
+    if journal is None:
+        table = QTable.from_arrays(keys, values)
+        rows = np.zeros(0, dtype=np.int64)
+    else:
+        count, rows, row_keys, row_values = journal
+        all_keys = np.zeros(max(count, len(keys)), dtype=np.uint64)
+        all_values = np.zeros((len(all_keys), header["action_size"]), dtype=np.float32)
+        all_keys[:len(keys)], all_values[:len(keys)] = keys, values
+        all_keys[rows], all_values[rows] = row_keys, row_values
+        table = QTable.from_arrays(all_keys, all_values)
+        rows = np.array(rows)
+    del keys, values  # Release the mappings
+    return table, rows
+
+
+def save(path, table):
+    """Write the whole table, atomically: a crash leaves either the old or the new file."""
+    save_arrays(path, table.keys[:table.size], table.values[:table.size])
+
+
+def save_arrays(path, keys, values, capacity=None):
+    """
+    Atomically write packed keys and their values, leaving room for capacity rows,
+    and drop the journal of the file it replaces.
+    """
+    count, action_size = values.shape
+    capacity = max(capacity or 0, count)
+    file_id = int.from_bytes(os.urandom(8), "little")
+
+    def write(f):
+        f.write(HEADER.pack(MAGIC, VERSION, action_size, capacity, count, file_id).ljust(HEADER_SIZE, b"\0"))
+        f.write(np.ascontiguousarray(keys, dtype=np.uint64).tobytes())
+        f.seek(_values_offset(capacity))
+        f.write(np.ascontiguousarray(values, dtype=np.float32).tobytes())
+        f.truncate(_file_size(capacity, action_size))
+
+    _replace(path, write)
+    if os.path.exists(journal_path(path)):
+        os.remove(journal_path(path))  # Its file_id no longer matches, so a crash before this is harmless
+
+
+def write_journal(path, rows, row_keys, row_values, count):
+    """
+    Atomically replace the journal of a binary Q-table with the given rows, e.g. every
+    row changed since the file was written, and the table's row count.
+    """
+    header = read_header(path)
+    if row_values.shape[1] != header["action_size"]:
+        raise ValueError(f"{path} holds {header['action_size']} actions, not {row_values.shape[1]}")
+
+    def write(f):
+        f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, VERSION, header["action_size"], count, header["file_id"],
+                                    len(rows)).ljust(HEADER_SIZE, b"\0"))
+        f.write(np.ascontiguousarray(rows, dtype=np.int64).tobytes())
+        f.write(np.ascontiguousarray(row_keys, dtype=np.uint64).tobytes())
+        f.write(np.ascontiguousarray(row_values, dtype=np.float32).tobytes())
+
+    _replace(journal_path(path), write)
+
+
+def write_snapshot(path, keys, values):
+    """
+    Atomically write a snapshot taken with QTable.to_arrays, as binary or JSON
+    depending on the file extension.
+    """
+    if path.endswith(".qtb"):
+        save_arrays(path, keys, values)
+        return
+    data = {str(unpack_state(key)): actions for key, actions in zip(keys.tolist(), values.tolist())}
+    _replace(path, lambda f: f.write(json.dumps(data).encode()))
+
+
+def read_json(path, action_size):
+    """Read a Q-table saved in the original JSON format."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    keys = [pack_state(ast.literal_eval(state_str)) for state_str in data]
+    values = np.array(list(data.values()), dtype=np.float32).reshape(len(keys), action_size)
+    return QTable.from_arrays(keys, values)
+
+
+def convert_json(json_path, binary_path, action_size=4):
+    table = read_json(json_path, action_size)
+    save(binary_path, table)
+    return len(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a JSON Q-table to the binary format.")
+    parser.add_argument("json_path")
+    parser.add_argument("binary_path", nargs="?")
+    parser.add_argument("--action-size", type=int, default=4)
+    args = parser.parse_args()
+    binary_path = args.binary_path or os.path.splitext(args.json_path)[0] + ".qtb"
+    n_states = convert_json(args.json_path, binary_path, args.action_size)
+    print(f"Converted {n_states} states to {binary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of the last capacity transitions in preallocated NumPy arrays.
+    States are stored as packed Q-table keys. Sampling is uniform, or proportional
+    to priority ** alpha when prioritised, with new transitions given the highest
+    priority seen so far so each is replayed at least once soon after it is added.
+    """
+    def __init__(self, capacity, prioritised=False, alpha=0.6, beta=0.4, seed=None):
+        self.capacity = int(capacity)
+        self.prioritised = prioritised
+        self.alpha = alpha  # How strongly priorities skew sampling, 0 for uniform
+        self.beta = beta    # How much importance weights undo that skew, 1 for fully
+        self.states = np.zeros(self.capacity, dtype=np.uint64)
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_states = np.zeros(self.capacity, dtype=np.uint64)
+        self.priorities = np.zeros(self.capacity, dtype=np.float64)
+        self.max_priority = 1.0
+        self.position = 0  # Next slot to write
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state_key, action, reward, next_state_key):
+        i = self.position
+        self.states[i] = state_key
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state_key
+        self.priorities[i] = self.max_priority
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        A batch of (indices, states, actions, rewards, next_states, weights).
+        weights are the importance-sampling weights of prioritised sampling, scaled
+        so the largest is 1; uniform sampling gives all ones.
+        """
+        if self.prioritised:
+            probabilities = self.priorities[:self.size] ** self.alpha
+            probabilities /= probabilities.sum()
+            indices = self.rng.choice(self.size, batch_size, p=probabilities)
+            weights = (self.size * probabilities[indices]) ** -self.beta
+            weights /= weights.max()
+        else:
+            indices = self.rng.integers(0, self.size, batch_size)
+            weights = np.ones(batch_size)
+        return (indices, self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], weights)
+
+    def get_state(self):
+        """Contents and sampling state, as (scalars, arrays), for a training checkpoint."""
+        scalars = {"capacity": self.capacity, "position": self.position, "size": self.size,
+                   "max_priority": self.max_priority, "rng": self.rng.bit_generator.state}
+        arrays = {"states": self.states, "actions": self.actions, "rewards": self.rewards,
+                  "next_states": self.next_states, "priorities": self.priorities}
+        return scalars, {name: values[:self.size].copy() for name, values in arrays.items()}
+
+    def set_state(self, scalars, arrays):
+        if scalars["capacity"] != self.capacity:
+            raise ValueError(f"Replay buffer holds {self.capacity} transitions, the checkpoint {scalars['capacity']}")
+        for name, values in arrays.items():
+            getattr(self, name)[:len(values)] = values
+        self.position, self.size = scalars["position"], scalars["size"]
+        self.max_priority = scalars["max_priority"]
+        self.rng.bit_generator.state = scalars["rng"]
+
+    def update_priorities(self, indices, td_errors, epsilon=1e-3):
+        """Set sampled transitions' priorities to their new absolute TD errors."""
+        if not self.prioritised:
+            return
+        priorities = np.abs(td_errors) + epsilon  # Never zero, so every transition can be drawn again
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, float(priorities.max()))
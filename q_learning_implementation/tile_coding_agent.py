@@ -0,0 +1,144 @@
+import os
+from functools import partial
+import numpy as np
+from simulation_settings import QL_SETTINGS, CAR_SETTINGS, TILE_CODING_SETTINGS
+from q_learning_implementation.exploration import ExplorationSchedule, RandomStream
+
+
+class TileCoder:
+    """
+    Hashed tile coding of points in the unit cube.
+    Each of n_tilings grids splits every dimension into tiles_per_dimension tiles and
+    is shifted by a different fraction of a tile; a point activates one tile per
+    tiling. Tiles are hashed into memory_per_tiling slots of their tiling, so memory
+    stays fixed however many dimensions there are, and nearby points share tiles.
+    """
+    def __init__(self, n_dimensions, n_tilings=8, tiles_per_dimension=6, memory_per_tiling=4096, seed=0):
+        self.n_dimensions = n_dimensions
+        self.n_tilings = n_tilings
+        self.tiles_per_dimension = tiles_per_dimension
+        self.memory_per_tiling = memory_per_tiling
+        self.size = n_tilings * memory_per_tiling
+        # Asymmetric offsets (1, 3, 5, ... tile fractions per tiling) avoid diagonal artefacts
+        odd = 2 * np.arange(n_dimensions) + 1
+        self.offsets = (np.arange(n_tilings)[:, None] * odd[None, :] / n_tilings) % 1.0
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(1, 2 ** 62, n_dimensions, dtype=np.uint64) | np.uint64(1)
+        self.tiling_starts = np.arange(n_tilings, dtype=np.int64) * memory_per_tiling
+
+    def indices(self, point):
+        """Active weight index in each tiling for a point in [0, 1]^n_dimensions."""
+        point = np.clip(np.asarray(point, dtype=np.float64), 0.0, 1.0)
+        coords = np.floor(point * self.tiles_per_dimension + self.offsets).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            hashed = (coords * self.multipliers).sum(axis=1, dtype=np.uint64)
+            hashed ^= hashed >> np.uint64(29)
+        return self.tiling_starts + (hashed % np.uint64(self.memory_per_tiling)).astype(np.int64)
+
+
+class TileCodingAgent:
+    """
+    Linear Q-function over tile-coded continuous sensor readings, with the same
+    interface as QLearningAgent. States are the car's speed, sensor distances and,
+    with ANGLE_BINS set, heading, scaled to [0, 1] and turned into their active tiles
+    by observe. Q-values are sums of one weight per tiling, so lookups and memory
+    cost the same however many states the car visits, and updates generalise to
+    nearby unseen states.
+    """
+    def __init__(self, state_size, action_size):
+        self.state_size = state_size  # Speed, one distance per sensor and optionally the heading
+        self.action_size = action_size
+        settings = TILE_CODING_SETTINGS
+        self.coder = TileCoder(state_size, settings["TILINGS"], settings["TILES_PER_DIMENSION"],
+                               settings["MEMORY_PER_TILING"], settings["SEED"])
+        self.weights = np.zeros((self.coder.size, action_size), dtype=np.float32)
+        self.q_table_path = os.path.join("q_learning_implementation", "q_tables", settings["WEIGHTS_FILENAME"])
+        self.learning_rate = QL_SETTINGS["LEARNING_RATE"] / self.coder.n_tilings  # Split over the active tiles
+        self.discount_factor = QL_SETTINGS["DISCOUNT_FACTOR"]
+        self.exploration = ExplorationSchedule.from_settings()
+        self.exploration_rate = self.exploration.rate
+        self.rng = RandomStream()
+        self._scale = None  # 1 / (max speed, sensor lengths[, 360]), set from the first car observed
+
+    def observe(self, car):
+        """Active tile indices of the car's current speed, sensor distances and heading."""
+        n_sensors = len(car.sensor_distances)
+        if self._scale is None:
+            ranges = [[CAR_SETTINGS["MAX_SPEED"]], car.sensor_lengths, [360.0] * (self.state_size - 1 - n_sensors)]
+            self._scale = 1.0 / np.concatenate(ranges)
+        point = np.empty(self.state_size)
+        point[0] = car.speed
+        point[1:1 + n_sensors] = car.sensor_distances
+        if self.state_size > 1 + n_sensors:
+            point[-1] = car.angle % 360
+        return self.coder.indices(point * self._scale)
+
+    def q_values(self, state):
+        return self.weights[state].sum(axis=0)
+
+    def get_action(self, state, use_epsilon=True):
+        """Choose an action based on the current state using epsilon-greedy strategy."""
+        if use_epsilon and self.rng.uniform(0, 1) < self.exploration_rate:
+            return self.rng.randint(0, self.action_size - 1)
+        return int(self.q_values(state).argmax())
+
+    def update_q_value(self, state, action, reward, next_state):
+        """Semi-gradient Q-learning step on the weights of the state's active tiles."""
+        q = float(self.weights[state, action].sum())
+        max_next_q = float(self.q_values(next_state).max())
+        self.weights[state, action] += self.learning_rate * (reward + self.discount_factor * max_next_q - q)
+
+    def decay_exploration(self):
+        """Report a training step to the exploration schedule; only per-step schedules decay here."""
+        self.exploration_rate = self.exploration.on_step()
+
+    def end_episode(self):
+        """Report a finished training episode to the exploration schedule."""
+        self.exploration_rate = self.exploration.on_episode()
+
+    def get_training_state(self):
+        """Exploration and RNG state for a training checkpoint, as (state, arrays)."""
+        return {"exploration": self.exploration.state(), "rng": self.rng.get_state()}, {}
+
+    def set_training_state(self, state, arrays):
+        self.exploration.set_state(state["exploration"])
+        self.exploration_rate = self.exploration.rate
+        self.rng.set_state(state["rng"])
+
+    def model_size(self):
+        """Tiles that have been updated at least once."""
+        return int(np.count_nonzero(self.weights.any(axis=1)))
+
+    def share_model(self, other):
+        self.weights = other.weights
+
+    def _config(self):
+        coder = self.coder
+        return np.array([coder.n_dimensions, coder.n_tilings, coder.tiles_per_dimension,
+                         coder.memory_per_tiling, self.action_size], dtype=np.int64)
+
+    def load_q_table(self):
+        """Load the weights; returns False if there is no weights file."""
+        if not os.path.exists(self.q_table_path):
+            return False
+        with np.load(self.q_table_path) as data:
+            if not np.array_equal(data["config"], self._config()):
+                raise ValueError(f"{self.q_table_path} was trained with different tile coding settings")
+            self.weights = data["weights"].astype(np.float32)
+        return True
+
+    def save_q_table(self):
+        self.snapshot()()
+
+    def snapshot(self):
+        """A call that atomically writes a copy of the current weights, for CheckpointWriter."""
+        return partial(write_weights, self.q_table_path, self.weights.copy(), self._config())
+
+
+def write_weights(path, weights, config):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, weights=weights, config=config)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import random
+from functools import partial
+import numpy as np
+from simulation_settings import QL_SETTINGS, SESSION_SETTINGS, CAR_SETTINGS, STATE_SETTINGS, TILE_CODING_SETTINGS
+from q_learning_implementation.exploration import RandomStream
+
+# A training checkpoint sits next to the agent's Q-table (or weights) file:
+#   <name>.ckpt.json   epsilon schedule, RNG states, run progress and settings
+#   <name>.ckpt.npz    replay buffer contents, when replay is on
+# CheckpointWriter writes it right after each Q-table snapshot, from the same moment
+# of training, so a resumed run carries on as if it had never stopped.
+VERSION = 1
+EXTENSION = ".ckpt.json"
+ARRAYS_EXTENSION = ".ckpt.npz"
+
+# Settings stored with a checkpoint; a resume with different values is reported,
+# apart from session settings that do not change what is learned
+LEARNING_SESSION_SETTINGS = ("EPISODE_DURATION", "STEPS_PER_SECOND")
+SETTINGS = {
+    "QL_SETTINGS": QL_SETTINGS,
+    "SESSION_SETTINGS": SESSION_SETTINGS,
+    "CAR_SETTINGS": CAR_SETTINGS,
+    "STATE_SETTINGS": STATE_SETTINGS,
+    "TILE_CODING_SETTINGS": TILE_CODING_SETTINGS,
+}
+
+
+def checkpoint_path(model_path):
+    return os.path.splitext(model_path)[0] + EXTENSION
+
+
+def arrays_path(model_path):
+    return os.path.splitext(model_path)[0] + ARRAYS_EXTENSION
+
+
+def seed_agent(agent, seed):
+    """Seed everything a fresh training run draws from, so it can be repeated exactly."""
+    random.seed(seed)
+    agent.rng = RandomStream(seed)
+    if getattr(agent, "replay", None) is not None:
+        agent.replay.rng = np.random.default_rng(seed)
+
+
+def capture(agent, **run):
+    """
+    Training state of agent plus the run progress given as keywords (episode counts
+    and the like), copied now. Returns a call that writes it, for CheckpointWriter.
+    """
+    agent_state, arrays = agent.get_training_state()
+    checkpoint = {
+        "version": VERSION,
+        "time": time.time(),
+        "model_path": agent.q_table_path,
+        "model_size": agent.model_size(),
+        "exploration_rate": agent.exploration_rate,
+        "agent": agent_state,
+        "run": run,
+        "settings": {name: dict(values) for name, values in SETTINGS.items()},
+    }
+    return partial(write, agent.q_table_path, checkpoint, arrays)
+
+
+def write(model_path, checkpoint, arrays):
+    """Atomically write a checkpoint; the arrays go first so the JSON never points at missing ones."""
+    if arrays:
+        tmp_path = arrays_path(model_path) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, arrays_path(model_path))
+    tmp_path = checkpoint_path(model_path) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path(model_path))
+
+
+def load(model_path):
+    """The checkpoint saved with a model file as (checkpoint, arrays), or None if there is none."""
+    path = checkpoint_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("version") != VERSION:
+        raise ValueError(f"{path} has unsupported checkpoint version {checkpoint.get('version')}")
+    arrays = {}
+    if os.path.exists(arrays_path(model_path)):
+        with np.load(arrays_path(model_path)) as data:
+            arrays = {name: data[name] for name in data.files}
+    return checkpoint, arrays
+
+
+def changed_settings(checkpoint):
+    """(name, checkpoint value, current value) of every stored setting that now differs."""
+    changed = []
+    for group, saved in checkpoint["settings"].items():
+        current = SETTINGS.get(group, {})
+        for name, value in saved.items():
+            if group == "SESSION_SETTINGS" and name not in LEARNING_SESSION_SETTINGS:
+                continue
+            if name in current and current[name] != value:
+                changed.append((f"{group}[{name!r}]", value, current[name]))
+    return changed
+
+
+def restore(agent, checkpoint, arrays):
+    """Put a loaded checkpoint's training state back into agent; returns the run progress."""
+    agent.set_training_state(checkpoint["agent"], arrays)
+    if checkpoint["model_size"] != agent.model_size():
+        print(f"Warning: checkpoint was taken with {checkpoint['model_size']} states, "
+              f"the loaded model has {agent.model_size()}")
+    return checkpoint["run"]
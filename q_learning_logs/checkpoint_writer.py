@@ -0,0 +1,87 @@
+import threading
+from simulation_settings import SESSION_SETTINGS
+
+
+class CheckpointWriter:
+    """
+    Background thread that takes Q-table saves and episode logging off the simulation loop.
+    The simulation thread only copies the table into a snapshot every SAVE_EVERY_EPISODES
+    episodes, usually just the rows changed since the last one (see QLearningAgent.snapshot),
+    so snapshots are written in the order they were taken. Episode records are flushed
+    in batches.
+    training_state, if given, is called with each snapshot and returns a call that
+    writes the matching training checkpoint (see training_checkpoint.capture).
+    """
+    def __init__(self, agent, logger=None, save_every=None, flush_interval=1.0, training_state=None):
+        self.agent = agent
+        self.logger = logger
+        self.training_state = training_state
+        self.save_every = save_every or SESSION_SETTINGS["SAVE_EVERY_EPISODES"]
+        self.flush_interval = flush_interval  # Seconds between batched log writes
+        self._episodes_since_save = 0
+        self._episodes = []  # Metrics dicts waiting to be logged
+        self._snapshots = []  # Write calls waiting to run, oldest first
+        self._closed = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="CheckpointWriter", daemon=True)
+        self._thread.start()
+
+    def log_score(self, score):
+        self.log_episode({"score": score})
+
+    def log_episode(self, metrics):
+        """Queue one episode's metrics dict (see episode_log.RECORD) for the log."""
+        self._raise_error()
+        with self._condition:
+            self._episodes.append(metrics)
+
+    def save_q_table(self):
+        """Queue a snapshot of the agent's Q-table to be written in the background."""
+        self._raise_error()
+        writes = [self.agent.snapshot()]  # Copies the table (or its changed rows) now, writes it later
+        if self.training_state:
+            writes.append(self.training_state())  # Written after the table it belongs to
+        with self._condition:
+            self._snapshots.extend(writes)
+            self._condition.notify()
+        self._episodes_since_save = 0
+
+    def episode_finished(self, score, **metrics):
+        """Log the episode score and metrics and save on the configured cadence."""
+        self.log_episode(dict(metrics, score=score))
+        self._episodes_since_save += 1
+        if self._episodes_since_save >= self.save_every:
+            self.save_q_table()
+
+    def close(self):
+        """Write a final snapshot if episodes are unsaved, flush the log and stop the thread."""
+        if self._episodes_since_save:
+            self.save_q_table()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("Checkpoint writer failed") from self._error
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._snapshots or self._closed, self.flush_interval)
+                episodes, self._episodes = self._episodes, []
+                snapshots, self._snapshots = self._snapshots, []
+                closed = self._closed
+            try:
+                if episodes and self.logger:
+                    self.logger.log_episodes(episodes)
+                for write in snapshots:
+                    write()
+            except Exception as error:  # Surface disk errors on the simulation thread
+                self._error = error
+                return
+            if closed:
+                return
@@ -0,0 +1,134 @@
+import os
+import time
+import struct
+import numpy as np
+
+# Binary episode log layout:
+#   64-byte header: magic, version, record size
+#   fixed-size records, one per episode, in the order they were logged
+# The record count follows from the file size, so the last record and any episode
+# range are read with a single seek, and the whole log loads as a NumPy array.
+MAGIC = b"EPLG"
+VERSION = 1
+HEADER = struct.Struct("<4sII")
+HEADER_SIZE = 64
+EXTENSION = ".eplog"
+
+RECORD = np.dtype([
+    ("timestamp", "<f8"),      # Unix time the episode ended
+    ("episode", "<i8"),
+    ("score", "<f8"),
+    ("steps", "<i4"),
+    ("epsilon", "<f4"),
+    ("collisions", "<i4"),
+    ("checkpoints", "<i4"),
+    ("laps", "<i4"),
+    ("q_table_size", "<i8"),
+    ("steps_per_sec", "<f4"),
+    ("wall_time", "<f4"),      # Seconds the episode took
+])
+
+# Metrics that were not measured: NaN for floats, -1 for counts
+MISSING = {name: (np.nan if RECORD[name].kind == "f" else -1) for name in RECORD.names}
+
+
+class EpisodeLog:
+    """
+    Append-only log of per-episode training metrics in fixed-size binary records.
+    Reads go through a memory map, so the tail or a time range costs one seek and
+    a million-episode history loads without parsing.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._repaired = False
+        if len(self):
+            self._check_header()
+
+    def _check_header(self):
+        with open(self.path, "rb") as f:
+            magic, version, record_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not an episode log")
+        if version != VERSION or record_size != RECORD.itemsize:
+            raise ValueError(f"{self.path} has unsupported episode log version {version}")
+
+    def _repair(self):
+        """
+        Drop a partial record left by an interrupted write, so appends stay aligned.
+        Only the writer does this; readers just ignore a partial last record.
+        """
+        self._repaired = True
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        if size < HEADER_SIZE:  # Header never finished; start the log again
+            os.remove(self.path)
+            return
+        valid = HEADER_SIZE + (size - HEADER_SIZE) // RECORD.itemsize * RECORD.itemsize
+        if size != valid:
+            with open(self.path, "r+b") as f:
+                f.truncate(valid)
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        return max(os.path.getsize(self.path) - HEADER_SIZE, 0) // RECORD.itemsize
+
+    def truncate(self, count):
+        """Drop every record after the first count."""
+        if len(self) > count:
+            with open(self.path, "r+b") as f:
+                f.truncate(HEADER_SIZE + count * RECORD.itemsize)
+
+    def make_records(self, metrics):
+        """Structured records from dicts of metrics; missing fields get MISSING values."""
+        records = np.empty(len(metrics), dtype=RECORD)
+        first_episode = len(self) + 1
+        now = time.time()
+        for index, values in enumerate(metrics):
+            defaults = dict(MISSING, timestamp=now, episode=first_episode + index)
+            records[index] = tuple(values.get(name, defaults[name]) for name in RECORD.names)
+        return records
+
+    def append(self, metrics):
+        """Append one record per dict of metrics, with a single write."""
+        if not metrics:
+            return
+        if not self._repaired:
+            self._repair()
+        records = self.make_records(metrics)
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize).ljust(HEADER_SIZE, b"\0"))
+        with open(self.path, "ab") as f:
+            f.write(records.tobytes())
+            f.flush()
+
+    def load(self, start=0, stop=None):
+        """Records start:stop (all by default) as a read-only memory-mapped array."""
+        count = len(self)
+        start, stop, _ = slice(start, stop).indices(count)
+        if stop <= start:
+            return np.zeros(0, dtype=RECORD)
+        return np.memmap(self.path, dtype=RECORD, mode="r",
+                         offset=HEADER_SIZE + start * RECORD.itemsize, shape=(stop - start,))
+
+    def last(self):
+        """The last record, or None for an empty log."""
+        records = self.load(-1)
+        return records[0] if len(records) else None
+
+    def time_range(self, start_time, end_time):
+        """Records of episodes that ended in [start_time, end_time), by binary search on timestamp."""
+        times = self.load()["timestamp"] if len(self) else np.zeros(0)
+        start, stop = np.searchsorted(times, [start_time, end_time])
+        return self.load(int(start), int(stop))
+
+
+def convert_text_log(text_path, log_path):
+    """Import a one-score-per-line log; its episodes get no time or other metrics."""
+    with open(text_path, "r") as f:
+        scores = [float(line) for line in f if line.strip()]
+    EpisodeLog(log_path).append([{"score": score, "timestamp": 0.0} for score in scores])
+    return len(scores)
@@ -1,25 +1,50 @@
 import os
+from simulation_settings import SESSION_SETTINGS
+from q_learning_logs.episode_log import EpisodeLog, EXTENSION, convert_text_log
 
 class Logger:
-    def __init__(self, log_file="training_log.txt"):    # default file=training_log.txt if the user doesn't provide one
+    def __init__(self, log_file="training_log.txt", text_log=None):    # default file=training_log.txt if the user doesn't provide one
         self.log_directory = "q_learning_logs"  # Use q_learning_logs as the log directory
         self.log_file = os.path.join(self.log_directory, log_file)  # Full path to the log file
+        self.text_log = SESSION_SETTINGS["TEXT_LOG"] if text_log is None else text_log
 
         # Ensure the q_learning_logs directory exists
         os.makedirs(self.log_directory, exist_ok=True)
 
+        # Per-episode metrics go to a binary episode log next to the text log; the text
+        # log, one score per line for older tools, is only written when text_log is set.
+        # Scores logged before the binary log existed are imported once so the episode
+        # numbers carry on.
+        self.episode_log = EpisodeLog(os.path.splitext(self.log_file)[0] + EXTENSION)
+        if not len(self.episode_log) and os.path.exists(self.log_file):
+            convert_text_log(self.log_file, self.episode_log.path)
+
     def get_last_score(self):
-        try:
+        last = self.episode_log.last()  # One seek, however long the log is
+        return float(last["score"]) if last is not None else 0.0
+
+    def truncate(self, episodes):
+        """
+        Keep only the first episodes entries of both logs, e.g. to drop episodes a
+        resumed run is about to repeat.
+        """
+        self.episode_log.truncate(episodes)
+        if os.path.exists(self.log_file):
             with open(self.log_file, "r") as log_file:
                 lines = log_file.readlines()
-                if lines:
-                    last_line = lines[-1]  # Get the last line
-                    last_score = float(last_line.strip())  # Convert the score to float
-                    return last_score
-        except FileNotFoundError:
-            return 0.0  # If the file doesn't exist, return 0.0
-        return 0.0  # If the file is empty, return 0.0
+            if len(lines) > episodes:
+                with open(self.log_file, "w") as log_file:
+                    log_file.writelines(lines[:episodes])
 
     def log_score(self, score):
+        self.log_episodes([{"score": score}])
+
+    def log_episodes(self, episodes):
+        """Append a dict of metrics per episode (see episode_log.RECORD) to the logs."""
+        if not episodes:
+            return
+        self.episode_log.append(episodes)
+        if not self.text_log:
+            return
         with open(self.log_file, "a") as log_file:
-            log_file.write(f"{score}\n")  # Write the score followed by a newline
\ No newline at end of file
+            log_file.write("".join(f"{episode['score']}\n" for episode in episodes))
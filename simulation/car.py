@@ -1,17 +1,43 @@
 import math
-import time
+import numpy as np
 import pygame
 from simulation.sensor import Sensor
-from simulation.checkpoint import Checkpoint
+from simulation.checkpoint import NO_GATE
+from simulation.collision import CollisionEngine, ON_ROAD, PARTIALLY_OFF, COMPLETELY_OFF
+from simulation.state_encoder import StateEncoder
+from simulation.renderer import RotatedSprites, sensor_overlay
 from simulation_settings import CAR_SETTINGS
 
+# (angle offset, length) of each sensor, shared with CarBatch
+SENSOR_SPECS = [
+    (-135, 100),  # back-left
+    (-90, 100),   # left
+    (-45, 150),   # front-left
+    (0, 200),     # front
+    (45, 150),    # front-right
+    (90, 100),    # right
+    (135, 100),   # back-right
+    (180, 80),    # back
+]
+
 class Car:
-    def __init__(self, environment):
+    def __init__(self, environment, state_encoder=None, colour=None):
         self.environment = environment
+        self.colour = colour or getattr(environment, "CAR_COLOUR", (100, 140, 200))
         self._initialize_starting_state()
         self._load_car_settings()
+        self.collision = CollisionEngine(environment.ROAD_MASK, self.width, self.height)
         self.image = self.make_car()
+        self._sprites = None  # Rotated images, built on first draw
         self.sensors = self.make_sensors()
+        self.sensor_offsets = np.array([sensor.angle_offset for sensor in self.sensors], dtype=np.float64)
+        self.sensor_lengths = np.array([sensor.length for sensor in self.sensors])
+        self.sensor_distances = [sensor.distance for sensor in self.sensors]
+        self._sensor_offsets = self.sensor_offsets.tolist()
+        self._sensor_lengths = self.sensor_lengths.tolist()
+        self.state_encoder = state_encoder or StateEncoder(
+            n_sensors=len(self.sensors), max_sensor_length=int(self.sensor_lengths.max()), max_speed=self.max_speed
+        )
         self.reset()
 
     def _initialize_starting_state(self):
@@ -36,35 +62,32 @@ class Car:
         self.x, self.y = self.initial_position[0], self.initial_position[1]
         self.angle = self.initial_angle
         self.speed = 0
+        self.max_speed = CAR_SETTINGS.get("MAX_SPEED", 10)  # Lowered while off the road
         self.score = 0
         self.collided = False
-        self.last_checkpoint = None
-        now = time.time()
+        # Progress through the track's checkpoint gates
+        self.lap = 0
+        self.checkpoints_hit = 0
+        self.next_gate = self.environment.checkpoint_index.first_gate()
+        self.crossed_gate = NO_GATE  # Gate crossed in order during the last step
+        now = self.environment.clock.time
         self.last_road_check_time = now
         self.last_speed_check_time = now
+        # The first state of an episode is read at the start, not left over from the last one
+        self.update_sensors()
 
     def make_car(self):
         surf = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        colour = getattr(self.environment, "CAR_COLOUR", (100, 140, 200))
-        surf.fill(colour)
+        surf.fill(self.colour)
         return surf
 
     def make_sensors(self):
-        sensor_specs = [
-                    (-135, 100),  # back-left
-                    (-90, 100),   # left
-                    (-45, 150),   # front-left
-                    (0, 200),     # front
-                    (45, 150),    # front-right
-                    (90, 100),    # right
-                    (135, 100),   # back-right
-                    (180, 80),    # back
-        ]
-        return [Sensor(self, angle, length) for angle, length in sensor_specs]
+        return [Sensor(self, angle, length) for angle, length in SENSOR_SPECS]
 
     def draw(self, window):
+        """Draw the car and its sensor field and return the screen rect drawn over."""
         # Draw the circular sensor field first (so the car is on top)
-        self.draw_sensor_radius(window, radius=120, color=(255, 0, 0, 60))  # 60 is alpha for transparency
+        dirty = self.draw_sensor_radius(window, radius=120, color=(*self.colour[:3], 60))  # 60 is alpha for transparency
 
         # Draw a dark red flash where any sensor detects a wall
         for sensor in self.sensors:
@@ -73,14 +96,17 @@ class Car:
                 rad = math.radians(angle_total)
                 obs_x = int(self.x + abs(sensor.distance) * math.cos(rad))
                 obs_y = int(self.y - abs(sensor.distance) * math.sin(rad))
-                pygame.draw.circle(window, (120, 0, 0), (obs_x, obs_y), 5)  # Dark red, radius 10
+                dirty.union_ip(pygame.draw.circle(window, (120, 0, 0), (obs_x, obs_y), 5))  # Dark red, radius 10
 
-        rotated = pygame.transform.rotate(self.image, self.angle)
+        if self._sprites is None:
+            self._sprites = RotatedSprites(self.image)
+        rotated = self._sprites.get(self.angle)
         rect = rotated.get_rect(center=(self.x, self.y))
-        window.blit(rotated, rect.topleft)
+        dirty.union_ip(window.blit(rotated, rect.topleft))
         # Optionally, comment out the line sensors if you only want the circle:
         # for sensor in self.sensors:
         #     sensor.draw(window)
+        return dirty
 
     def draw_sensor_radius(self, window, radius=120, color=(255, 0, 0, 60)):
         """
@@ -88,18 +114,20 @@ class Car:
         :param window: The pygame surface to draw on.
         :param radius: The radius of the sensor field.
         :param color: RGBA tuple for the sensor color (red, semi-transparent).
+        :return: The screen rect drawn over.
         """
-        # Create a transparent surface
-        sensor_surface = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
-        pygame.draw.circle(sensor_surface, color, (radius, radius), radius)
-        # Blit the sensor surface centered on the car
-        window.blit(sensor_surface, (self.x - radius, self.y - radius))
+        # The transparent circle surface is cached, only the blit happens per frame
+        return window.blit(sensor_overlay(radius, tuple(color)), (self.x - radius, self.y - radius))
 
     def get_state(self):
         state = [int(self.speed)]
         state.extend(int(sensor.distance / 10) for sensor in self.sensors)
         return tuple(state)
 
+    def get_state_id(self):
+        """Packed integer state from the car's state encoder."""
+        return self.state_encoder.encode(self.speed, self.sensor_distances, self.angle)
+
     def normalize_angle(self, angle):
         """Normalize the angle to be between 0 and 359."""
         return angle % 360
@@ -141,9 +169,20 @@ class Car:
         self.update()
 
     def update(self):
+        profiler = self.environment.profiler
+        previous_x, previous_y = self.x, self.y
+        started = profiler.start()
         self.update_position()
+        profiler.stop("car.position", started)
+        started = profiler.start()
         self.update_sensors()
+        profiler.stop("car.sensors", started)
+        started = profiler.start()
         self.check_collision(check_type="TRACK")
+        profiler.stop("car.collision", started)
+        started = profiler.start()
+        self.update_progress(previous_x, previous_y)
+        profiler.stop("car.progress", started)
 
     def accelerate(self):
         """Accelerate the car."""
@@ -163,15 +202,16 @@ class Car:
         rad_angle = math.radians(self.angle)
         new_x = self.x + self.speed * math.cos(rad_angle)
         new_y = self.y - self.speed * math.sin(rad_angle)
-        
-        road_status = self.check_road_status(new_x, new_y)
+
+        # Long moves are swept, so the car stops at a wall instead of jumping over it
+        road_status, new_x, new_y = self.collision.sweep(self.x, self.y, new_x, new_y, self.angle)
         self.adjust_speed_and_position(road_status, new_x, new_y)
 
     def adjust_speed_and_position(self, road_status, new_x, new_y):
         """Adjust the car's speed and position based on its road status."""
-        if road_status == "on_road":
+        if road_status == ON_ROAD:
             self.max_speed = CAR_SETTINGS.get("MAX_SPEED", 10)
-        elif road_status == "partially_off":
+        elif road_status == PARTIALLY_OFF:
             self.max_speed = self.max_speed_partially_off
         else:
             self.max_speed = self.max_speed_completely_off
@@ -188,18 +228,11 @@ class Car:
                 half_h < self.y < self.environment.SCREEN_HEIGHT - half_h
             )
         elif check_type == "TRACK":
-            self.collided = self.check_road_status(self.x, self.y) == "completely_off"
+            self.collided = self.check_road_status(self.x, self.y) == COMPLETELY_OFF
 
     def check_road_status(self, x, y):
         """Check the road status at the given position."""
-        rotated_rect = self.get_rotated_vertices(pygame.Rect(x - self.width / 2, y - self.height / 2, self.width, self.height))
-        on_road_count = sum(1 for vertex in rotated_rect if self.is_on_road(*vertex))
-        
-        if on_road_count == len(rotated_rect):
-            return "on_road"
-        elif on_road_count > 0:
-            return "partially_off"
-        return "completely_off"
+        return self.collision.road_status(x, y, self.angle)
 
     def get_rotated_vertices(self, rect):
         """Get the rotated vertices of the car's rectangle."""
@@ -212,47 +245,42 @@ class Car:
 
     def is_on_road(self, x, y):
         """Check if the given position is on the road."""
-        if 0 <= x < self.environment.SCREEN_WIDTH and 0 <= y < self.environment.SCREEN_HEIGHT:
-            colour_at_position = self.environment.TRACK_IMAGE.get_at((int(x), int(y)))
-            return colour_at_position in [self.environment.ROAD_COLOUR, 
-                                          self.environment.CHECKPOINT_COLOUR, 
-                                          self.environment.START_COLOUR]
-        return False
+        return self.environment.is_road(x, y)
 
     def update_sensors(self):
-        """Update the car's sensors."""
-        for sensor in self.sensors:
-            sensor.update(self.environment)
+        """Update all of the car's sensors with one vectorised ray cast."""
+        on_road = self.is_on_road(self.x, self.y)
+        angles = [self.angle + offset for offset in self._sensor_offsets]
+        self.sensor_distances = self.environment.ray_caster.distances(
+            self.x, self.y, angles, self._sensor_lengths, on_road
+        )
+        for sensor, distance in zip(self.sensors, self.sensor_distances):
+            sensor.set_reading(distance, on_road)
 
     def update_score(self, delta):
         """Update the car's score."""
         self.score = round(self.score + delta, 1)
 
-    def check_checkpoint(self, current_time, checkpoints):
-        """Check if the car has reached a checkpoint."""
-        radius = 2
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                if dx * dx + dy * dy <= radius * radius:
-                    check_x, check_y = int(self.x + dx), int(self.y + dy)
-                    if self.is_valid_position(check_x, check_y):
-                        colour_at_position = self.environment.TRACK_IMAGE.get_at((check_x, check_y))
-                        if colour_at_position == self.environment.CHECKPOINT_COLOUR:
-                            position = (check_x, check_y)
-                            if position == self.last_checkpoint:
-                                return 0
-                            if position in checkpoints:
-                                checkpoint = checkpoints[position]
-                                if checkpoint.is_active(current_time):
-                                    checkpoint.last_crossed = current_time
-                                    self.last_checkpoint = position
-                                    return 10
-                            else:
-                                checkpoints[position] = Checkpoint(position)
-                                checkpoints[position].last_crossed = current_time
-                                self.last_checkpoint = position
-                                return 10
-        return 0
+    def update_progress(self, previous_x, previous_y):
+        """Count the checkpoint gate and lap crossed by the last move, if any."""
+        index = self.environment.checkpoint_index
+        self.crossed_gate = NO_GATE
+        gate = index.crossed_gate(previous_x, previous_y, self.x, self.y)
+        if gate == NO_GATE:
+            return
+        next_gate, in_order, completed_lap = index.advance(self.next_gate, gate, self.checkpoints_hit)
+        if in_order:
+            self.checkpoints_hit += 1
+            self.crossed_gate = gate
+            self.next_gate = int(next_gate)
+            self.environment.profiler.count("checkpoints")
+        if completed_lap:
+            self.lap += 1
+            self.environment.profiler.count("laps")
+
+    def check_checkpoint(self):
+        """Reward for reaching the next checkpoint gate during the last step."""
+        return 10 if self.crossed_gate != NO_GATE else 0
 
     def is_valid_position(self, x, y):
         """Check if the given position is within the screen boundaries."""
@@ -260,14 +288,14 @@ class Car:
 
     def reward_road(self):
         """Calculate the reward based on the car's position on the road."""
-        current_time = time.time()
+        current_time = self.environment.clock.time
         if current_time - self.last_road_check_time >= 0.25:
             road_status = self.check_road_status(self.x, self.y)
             self.last_road_check_time = current_time
             
-            if road_status == "on_road":
+            if road_status == ON_ROAD:
                 return 0.5
-            return -0.5 if road_status == "partially_off" else -1
+            return -0.5 if road_status == PARTIALLY_OFF else -1
         return 0
 
     def reward_speed(self):
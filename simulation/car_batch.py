@@ -0,0 +1,223 @@
+import numpy as np
+from simulation.car import SENSOR_SPECS
+from simulation.checkpoint import NO_GATE
+from simulation.collision import SWEEP_STEP
+from simulation.state_encoder import StateEncoder
+from simulation_settings import CAR_SETTINGS
+
+# Road status codes, matching the strings returned by Car.check_road_status
+ON_ROAD = 0
+PARTIALLY_OFF = 1
+COMPLETELY_OFF = 2
+
+# Lateral sensors used by the distance reward, as in Car.reward_distance
+LATERAL_SENSORS = [0, 1, 3, 4]
+
+
+def round_1(values):
+    """
+    Round to one decimal exactly like Python's round(value, 1), which Car uses.
+    np.round scales by 10 first and can flip values sitting next to a .x5 tie,
+    so those few elements are rounded in Python instead.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in zip(*np.nonzero(near_tie)):
+        rounded[index] = round(float(values[index]), 1)
+    return rounded
+
+
+class CarBatch:
+    """
+    N cars stepping in lockstep on a shared track.
+    Holds the state of every car in NumPy arrays and applies the same physics,
+    sensors and rewards as Car, one vectorised operation per phase.
+    Collided cars are frozen until they are reset.
+    """
+    def __init__(self, environment, n_cars, state_encoder=None):
+        self.environment = environment
+        self.n_cars = n_cars
+        self._initialize_starting_state()
+        self._load_car_settings()
+        self.sensor_offsets = np.array([angle for angle, _ in SENSOR_SPECS], dtype=np.float64)
+        self.sensor_lengths = np.array([length for _, length in SENSOR_SPECS])
+        self._init_corner_offsets()
+        self.state_encoder = state_encoder or StateEncoder(
+            n_sensors=len(SENSOR_SPECS), max_sensor_length=int(self.sensor_lengths.max()),
+            max_speed=self.max_speed_on_road
+        )
+
+        self.x = np.zeros(n_cars)
+        self.y = np.zeros(n_cars)
+        self.angle = np.zeros(n_cars)
+        self.speed = np.zeros(n_cars)
+        self.max_speed = np.zeros(n_cars)
+        self.score = np.zeros(n_cars)
+        self.collided = np.zeros(n_cars, dtype=bool)
+        self.stepped = np.zeros(n_cars, dtype=bool)  # Cars that moved during the last step
+        self.on_road = np.zeros(n_cars, dtype=bool)
+        self.sensor_distances = np.zeros((n_cars, len(SENSOR_SPECS)), dtype=np.int64)
+        self.lap = np.zeros(n_cars, dtype=np.int64)
+        self.checkpoints_hit = np.zeros(n_cars, dtype=np.int64)
+        self.next_gate = np.zeros(n_cars, dtype=np.int64)
+        self.crossed_gate = np.full(n_cars, NO_GATE, dtype=np.int64)  # Gate crossed in order last step
+        self.reset()
+
+    def _initialize_starting_state(self):
+        start_info = self.environment.find_start_position()
+        if not start_info:
+            raise RuntimeError("No valid starting position found on the track.")
+        self.initial_position = tuple(start_info[:2])
+        self.initial_angle = start_info[2] % 360
+
+    def _load_car_settings(self):
+        settings = CAR_SETTINGS
+        self.width = int(settings.get("WIDTH", 40))
+        self.height = int(settings.get("HEIGHT", 20))
+        self.max_speed_on_road = settings.get("MAX_SPEED", 10)
+        self.max_speed_partially_off = settings.get("MAX_SPEED_PARTIALLY_OFF", 5)
+        self.max_speed_completely_off = settings.get("MAX_SPEED_COMPLETELY_OFF", 2)
+        self.acceleration = settings.get("ACCELERATION", 0.2)
+        self.deceleration = settings.get("DESACCELERATION", 0.95)
+        self.rotation_speed = settings.get("ROTATION_SPEED", 5)
+
+    def _init_corner_offsets(self):
+        # Car.check_road_status builds an integer pygame.Rect, so the corners sit at
+        # fixed offsets from the rect centre: topleft, topright, bottomright, bottomleft
+        half_w, half_h = self.width // 2, self.height // 2
+        self.corner_dx = np.array([-half_w, self.width - half_w, self.width - half_w, -half_w], dtype=np.float64)
+        self.corner_dy = np.array([-half_h, -half_h, self.height - half_h, self.height - half_h], dtype=np.float64)
+
+    def reset(self, mask=None):
+        """Reset all cars, or only those selected by a boolean mask."""
+        if mask is None:
+            mask = np.ones(self.n_cars, dtype=bool)
+        self.x[mask] = self.initial_position[0]
+        self.y[mask] = self.initial_position[1]
+        self.angle[mask] = self.initial_angle
+        self.speed[mask] = 0
+        self.max_speed[mask] = self.max_speed_on_road
+        self.score[mask] = 0
+        self.collided[mask] = False
+        self.lap[mask] = 0
+        self.checkpoints_hit[mask] = 0
+        self.next_gate[mask] = self.environment.checkpoint_index.first_gate()
+        self.crossed_gate[mask] = NO_GATE
+        self.stepped[mask] = False
+        self.update_sensors()  # As Car.reset, so the first state is read at the start
+
+    @property
+    def active(self):
+        return ~self.collided
+
+    def get_state_ids(self):
+        """Packed state IDs of all cars from the batch's state encoder."""
+        return self.state_encoder.encode_batch(self.speed, self.sensor_distances, self.angle)
+
+    def step(self, actions):
+        """Apply one action per car, then update positions, sensors and collisions."""
+        actions = np.asarray(actions)
+        active = self.active
+        self.stepped = active
+
+        accelerate = active & (actions == 0)
+        left = active & (actions == 1)
+        right = active & (actions == 2)
+        decelerate = active & (actions != 0) & (actions != 1) & (actions != 2)
+
+        self.speed = np.where(accelerate, np.minimum(self.speed + self.acceleration, self.max_speed), self.speed)
+        self.speed = np.where(decelerate, self.speed * self.deceleration, self.speed)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            turn = self.rotation_speed * (self.speed / self.max_speed)
+        turn = np.where(self.max_speed != 0, turn, 0)
+        self.angle = np.where(left, (self.angle + turn) % 360, self.angle)
+        self.angle = np.where(right, (self.angle - turn) % 360, self.angle)
+
+        previous_x, previous_y = self.x, self.y
+        self.update_position(active)
+        self.update_sensors()
+        self.collided |= active & (self.check_road_status(self.x, self.y, self.angle) == COMPLETELY_OFF)
+        self.update_progress(previous_x, previous_y, active)
+
+    def update_progress(self, previous_x, previous_y, active):
+        """Count the checkpoint gates and laps crossed by every car's last move."""
+        index = self.environment.checkpoint_index
+        gate = index.crossed_gates(previous_x, previous_y, self.x, self.y)
+        gate = np.where(active, gate, NO_GATE)
+        self.next_gate, in_order, completed_lap = index.advance(self.next_gate, gate, self.checkpoints_hit)
+        self.checkpoints_hit += in_order
+        self.lap += completed_lap
+        self.crossed_gate = np.where(in_order, gate, NO_GATE)
+        # The same counters as Car.update_progress, summed over the cars
+        if in_order.any():
+            self.environment.profiler.count("checkpoints", int(in_order.sum()))
+        if completed_lap.any():
+            self.environment.profiler.count("laps", int(completed_lap.sum()))
+
+    def update_position(self, active):
+        rad_angle = np.radians(self.angle)
+        new_x = self.x + self.speed * np.cos(rad_angle)
+        new_y = self.y - self.speed * np.sin(rad_angle)
+
+        road_status = self.check_road_status(new_x, new_y, self.angle)
+        new_x, new_y, road_status = self.sweep(new_x, new_y, road_status, active)
+        max_speed = np.select(
+            [road_status == ON_ROAD, road_status == PARTIALLY_OFF],
+            [self.max_speed_on_road, self.max_speed_partially_off],
+            self.max_speed_completely_off,
+        )
+        self.max_speed = np.where(active, max_speed, self.max_speed)
+        self.speed = np.where(active, np.minimum(self.speed, self.max_speed), self.speed)
+        self.x = np.where(active, new_x, self.x)
+        self.y = np.where(active, new_y, self.y)
+
+    def sweep(self, new_x, new_y, road_status, active):
+        """
+        Check moves longer than SWEEP_STEP at sub-steps, as CollisionEngine.sweep does:
+        a move is cut short at the first sub-step completely off the road.
+        """
+        dx, dy = new_x - self.x, new_y - self.y
+        distance = np.hypot(dx, dy)
+        n_steps = np.where(distance > SWEEP_STEP, np.ceil(distance / SWEEP_STEP), 1)
+        stopped = ~active
+        for step in range(1, int(n_steps.max())):
+            pending = ~stopped & (step < n_steps)
+            x = self.x + dx * step / n_steps
+            y = self.y + dy * step / n_steps
+            hit = pending & (self.check_road_status(x, y, self.angle) == COMPLETELY_OFF)
+            new_x = np.where(hit, x, new_x)
+            new_y = np.where(hit, y, new_y)
+            road_status = np.where(hit, COMPLETELY_OFF, road_status)
+            stopped |= hit
+        return new_x, new_y, road_status
+
+    def check_road_status(self, x, y, angle):
+        """Road status code of every car, from its four rotated corners."""
+        # pygame.Rect truncates toward zero
+        cx = np.trunc(x - self.width / 2) + self.width // 2
+        cy = np.trunc(y - self.height / 2) + self.height // 2
+        rad_angle = np.radians(angle)[:, None]
+        cos, sin = np.cos(rad_angle), np.sin(rad_angle)
+        vx = cx[:, None] + self.corner_dx * cos - self.corner_dy * sin
+        vy = cy[:, None] + self.corner_dx * sin + self.corner_dy * cos
+
+        on_road_count = self.environment.is_road_array(vx, vy).sum(axis=1)
+        return np.select([on_road_count == 4, on_road_count > 0], [ON_ROAD, PARTIALLY_OFF], COMPLETELY_OFF)
+
+    def update_sensors(self):
+        self.on_road = self.environment.is_road_array(self.x, self.y)
+        self.sensor_distances = self.environment.ray_caster.cast(
+            self.x, self.y, self.angle[:, None] + self.sensor_offsets, self.sensor_lengths, self.on_road
+        )
+
+    def calculate_reward(self):
+        """Reward of every car for the last step; cars that were already frozen get 0."""
+        reward_speed = round_1(self.speed / 6)
+        reward_distance = round_1(self.sensor_distances[:, LATERAL_SENSORS].min(axis=1) / 100)
+        total_reward = round_1(reward_speed * reward_distance)
+        total_reward = np.where(self.collided, total_reward - 25, total_reward)
+        total_reward = np.where(self.stepped, total_reward, 0)
+        self.score = round_1(self.score + total_reward)
+        return total_reward
@@ -1,7 +1,181 @@
-class Checkpoint:
-    def __init__(self, position):
-        self.position = position
-        self.last_crossed = 0 
+import math
+import numpy as np
+from simulation_settings import CAR_SETTINGS
 
-    def is_active(self, current_time):
-        return current_time - self.last_crossed >= 2
+NO_GATE = -1
+
+
+class CheckpointIndex:
+    """
+    Ordered checkpoint gates of a track, one line segment per gate.
+    Gate 0 is the start/finish line through the start pose, across the road;
+    the checkpoint stripes follow in driving order. Gates are oriented so that a
+    car driving forward crosses from the negative to the positive side, and
+    they are bucketed in a uniform grid, so finding the gate crossed by a move
+    only tests the few gates registered in the cell it ends in. Each gate is
+    registered in every cell within reach of it, the longest move a car makes in
+    one step, so a move that crosses a gate always ends in one of its cells.
+    """
+    CELL_SIZE = 32
+    START_GATE_LENGTH = 200  # Furthest the start line reaches to each side of the start
+
+    def __init__(self, segments, start_pose=None, start_segment=None, width=900, height=600, reach=None):
+        if reach is None:
+            reach = max(CAR_SETTINGS[name] for name in ("MAX_SPEED", "MAX_SPEED_PARTIALLY_OFF",
+                                                         "MAX_SPEED_COMPLETELY_OFF"))
+        self.reach = reach
+        self.has_start_gate = start_segment is not None
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        self.gates = self._order_gates(segments, start_pose, start_segment)
+        self.n_gates = len(self.gates)
+        self._build_grid(width, height)
+
+    @classmethod
+    def from_environment(cls, environment):
+        """Gates of an Environment's compiled checkpoint stripes and start line."""
+        start_pose = environment.find_start_position()
+        start_segment = None
+        if start_pose is not None:
+            start_segment = cls.start_line(environment.ray_caster, *start_pose)
+        return cls(environment.CHECKPOINT_SEGMENTS, start_pose, start_segment,
+                   environment.SCREEN_WIDTH, environment.SCREEN_HEIGHT)
+
+    @classmethod
+    def start_line(cls, ray_caster, x, y, angle):
+        """Segment through the start, perpendicular to the start heading, spanning the road."""
+        left, right = ray_caster.cast(x, y, [angle + 90, angle - 90], cls.START_GATE_LENGTH, True).tolist()
+        left_rad, right_rad = math.radians(angle + 90), math.radians(angle - 90)
+        return (x + left * math.cos(left_rad), y - left * math.sin(left_rad),
+                x + right * math.cos(right_rad), y - right * math.sin(right_rad))
+
+    def _order_gates(self, segments, start_pose, start_segment):
+        """
+        Chain the stripes from the start by nearest centre ahead of the previous one,
+        then orient every gate forward.
+        """
+        centres = (segments[:, :2] + segments[:, 2:]) / 2
+        remaining = list(range(len(segments)))
+        order = []
+        position, direction = None, None
+        if start_pose is not None:
+            rad = math.radians(start_pose[2])
+            position, direction = np.array(start_pose[:2], dtype=np.float64), np.array([math.cos(rad), -math.sin(rad)])
+        while remaining:
+            if position is None:
+                nearest = remaining[0]
+            else:
+                # Prefer stripes ahead of the direction of travel so the chain does not turn back
+                ahead = [i for i in remaining if (centres[i] - position) @ direction > 0] if direction is not None else []
+                nearest = min(ahead or remaining, key=lambda i: float(np.sum((centres[i] - position) ** 2)))
+                direction = centres[nearest] - position
+            order.append(nearest)
+            remaining.remove(nearest)
+            position = centres[nearest]
+
+        gates = segments[order]
+        if start_segment is not None:
+            gates = np.vstack([np.asarray(start_segment, dtype=np.float64), gates])
+
+        # Forward is towards the next gate, or along the start heading for the start line
+        gates = gates.copy()
+        centres = (gates[:, :2] + gates[:, 2:]) / 2
+        for gate in range(len(gates)):
+            if gate == 0 and start_segment is not None:
+                rad = math.radians(start_pose[2])
+                forward = centres[0] + (math.cos(rad), -math.sin(rad))
+            elif len(gates) > 1:
+                forward = centres[(gate + 1) % len(gates)]
+            else:
+                continue
+            if self._side(gates[gate], forward) < 0:
+                gates[gate] = gates[gate][[2, 3, 0, 1]]
+        return gates
+
+    @staticmethod
+    def _side(gate, point):
+        ax, ay, bx, by = gate
+        return (bx - ax) * (point[1] - ay) - (by - ay) * (point[0] - ax)
+
+    def _build_grid(self, width, height):
+        """Register every gate in each cell its bounding box, padded by reach and a pixel, touches."""
+        self.grid_cols = width // self.CELL_SIZE + 1
+        self.grid_rows = height // self.CELL_SIZE + 1
+        pad = self.reach + 1
+        cells = {}
+        for gate, (ax, ay, bx, by) in enumerate(self.gates.tolist()):
+            col0, col1 = self._cell(min(ax, bx) - pad), self._cell(max(ax, bx) + pad)
+            row0, row1 = self._cell(min(ay, by) - pad), self._cell(max(ay, by) + pad)
+            for row in range(max(row0, 0), min(row1, self.grid_rows - 1) + 1):
+                for col in range(max(col0, 0), min(col1, self.grid_cols - 1) + 1):
+                    cells.setdefault((row, col), []).append(gate)
+        self.cells = cells
+
+        # The same buckets as a padded array for vectorised queries
+        depth = max((len(gates) for gates in cells.values()), default=1)
+        self.cell_gates = np.full((self.grid_rows, self.grid_cols, depth), NO_GATE, dtype=np.int64)
+        for (row, col), gates in cells.items():
+            self.cell_gates[row, col, :len(gates)] = gates
+
+    def _cell(self, value):
+        return int(value // self.CELL_SIZE)
+
+    def crossed_gate(self, x0, y0, x1, y1):
+        """Gate crossed forward by a move from (x0, y0) to (x1, y1), or NO_GATE."""
+        dx, dy = x1 - x0, y1 - y0
+        for gate in self.cells.get((self._cell(y1), self._cell(x1)), ()):
+            ax, ay, bx, by = self.gates[gate].tolist()
+            rx, ry = bx - ax, by - ay
+            side0 = rx * (y0 - ay) - ry * (x0 - ax)
+            side1 = rx * (y1 - ay) - ry * (x1 - ax)
+            if side0 < 0 <= side1:
+                # Where the move meets the gate's line, as a fraction along the gate
+                along = ((x0 - ax) * dy - (y0 - ay) * dx) / (rx * dy - ry * dx)
+                if 0 <= along <= 1:
+                    return gate
+        return NO_GATE
+
+    def crossed_gates(self, x0, y0, x1, y1):
+        """Vectorised crossed_gate for arrays of moves."""
+        x0, y0, x1, y1 = (np.asarray(value, dtype=np.float64) for value in (x0, y0, x1, y1))
+        crossed = np.full(x0.shape, NO_GATE, dtype=np.int64)
+        if not self.n_gates:
+            return crossed
+        candidates = self._cell_candidates(x1, y1)
+        gates = self.gates[np.maximum(candidates, 0)]
+        ax, ay, bx, by = (gates[..., i] for i in range(4))
+        rx, ry = bx - ax, by - ay
+        x0, y0, x1, y1 = x0[..., None], y0[..., None], x1[..., None], y1[..., None]
+        side0 = rx * (y0 - ay) - ry * (x0 - ax)
+        side1 = rx * (y1 - ay) - ry * (x1 - ax)
+        denominator = rx * (y1 - y0) - ry * (x1 - x0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            along = ((x0 - ax) * (y1 - y0) - (y0 - ay) * (x1 - x0)) / denominator
+        hit = (candidates != NO_GATE) & (side0 < 0) & (side1 >= 0) & (along >= 0) & (along <= 1)
+        any_hit = hit.any(axis=-1)
+        first = np.argmax(hit, axis=-1)
+        crossed[any_hit] = np.take_along_axis(candidates, first[..., None], axis=-1)[..., 0][any_hit]
+        return crossed
+
+    def _cell_candidates(self, x, y):
+        rows = np.clip(np.floor_divide(y, self.CELL_SIZE), 0, self.grid_rows - 1).astype(np.intp)
+        cols = np.clip(np.floor_divide(x, self.CELL_SIZE), 0, self.grid_cols - 1).astype(np.intp)
+        inside = (x >= 0) & (y >= 0) & (x < self.grid_cols * self.CELL_SIZE) & (y < self.grid_rows * self.CELL_SIZE)
+        return np.where(inside[..., None], self.cell_gates[rows, cols], NO_GATE)
+
+    def first_gate(self):
+        """Gate a car at the start should cross next: the one after the start line."""
+        if not self.n_gates:
+            return NO_GATE
+        return 1 % self.n_gates if self.has_start_gate else 0
+
+    def advance(self, next_gate, gate, checkpoints_hit):
+        """
+        Progress after crossing gate: returns (next_gate, in_order, completed_lap).
+        Only the expected next gate counts; gate 0 closes a lap once the car has
+        started one (from the start line, or by crossing gate 0 before).
+        Works on scalars and on arrays of cars.
+        """
+        in_order = (gate != NO_GATE) & (gate == next_gate)
+        completed_lap = in_order & (gate == 0) & (self.has_start_gate | (checkpoints_hit > 0))
+        next_gate = np.where(in_order, (gate + 1) % max(self.n_gates, 1), next_gate)
+        return next_gate, in_order, completed_lap
@@ -0,0 +1,19 @@
+class SimulationClock:
+    """
+    Fixed-timestep clock shared by the environment, cars and checkpoints.
+    Time only moves when the simulation steps, so rewards and cooldowns do not
+    depend on how fast the machine runs.
+    """
+    def __init__(self, steps_per_second=240):
+        self.dt = 1 / steps_per_second  # Seconds of simulation time per step
+        self.reset()
+
+    def reset(self):
+        self.steps = 0
+        self.time = 0.0
+
+    def tick(self):
+        """Advance the clock by one fixed step."""
+        self.steps += 1
+        self.time = self.steps * self.dt  # Multiply instead of summing dt to avoid drift
+        return self.time
@@ -0,0 +1,75 @@
+import math
+import numpy as np
+
+# Road status strings, as returned by Car.check_road_status
+ON_ROAD = "on_road"
+PARTIALLY_OFF = "partially_off"
+COMPLETELY_OFF = "completely_off"
+
+SWEEP_STEP = 2.0  # Longest move, in pixels, checked at its end point only
+
+
+class CollisionEngine:
+    """
+    Road status of a car's rotated rectangle, straight from the track's road mask.
+    The last (x, y, angle) result is memoised (a step asks for the same pose from
+    update_position, check_collision and the rewards), and moves longer than
+    SWEEP_STEP are checked at sub-steps so a fast car cannot jump over a thin wall.
+    Results match the original pygame.Rect based check exactly.
+    """
+    def __init__(self, road_mask, width, height):
+        self.screen_height, self.screen_width = road_mask.shape
+        self._road = np.ascontiguousarray(road_mask, dtype=np.uint8).tobytes()  # Flat, fast to index
+        self.width, self.height = int(width), int(height)
+        # pygame.Rect truncates to integers, so the corners sit at fixed offsets from
+        # the rect centre: topleft, topright, bottomright, bottomleft
+        half_w, half_h = self.width // 2, self.height // 2
+        self.corner_offsets = [(-half_w, -half_h), (self.width - half_w, -half_h),
+                               (self.width - half_w, self.height - half_h), (-half_w, self.height - half_h)]
+        self._memo_key = None
+        self._memo_status = None
+
+    def vertices(self, x, y, angle):
+        """
+        The four rotated corners of a car centred at (x, y).
+        The angle is used exactly, not quantised, so the status matches the original
+        check; the trig is too cheap to be worth caching per angle.
+        """
+        cx = int(x - self.width / 2) + self.width // 2
+        cy = int(y - self.height / 2) + self.height // 2
+        rad_angle = math.radians(angle)
+        cos, sin = math.cos(rad_angle), math.sin(rad_angle)
+        return [(cx + dx * cos - dy * sin, cy + dx * sin + dy * cos) for dx, dy in self.corner_offsets]
+
+    def road_status(self, x, y, angle):
+        key = (x, y, angle)
+        if key == self._memo_key:
+            return self._memo_status
+        road, width, height = self._road, self.screen_width, self.screen_height
+        on_road_count = 0
+        for vx, vy in self.vertices(x, y, angle):
+            if 0 <= vx < width and 0 <= vy < height and road[int(vy) * width + int(vx)]:
+                on_road_count += 1
+        if on_road_count == 4:
+            status = ON_ROAD
+        elif on_road_count > 0:
+            status = PARTIALLY_OFF
+        else:
+            status = COMPLETELY_OFF
+        self._memo_key, self._memo_status = key, status
+        return status
+
+    def sweep(self, x0, y0, x1, y1, angle):
+        """
+        Road status of a move from (x0, y0) to (x1, y1), as (status, x, y).
+        A move is cut short at the first sub-step completely off the road.
+        """
+        dx, dy = x1 - x0, y1 - y0
+        distance = math.hypot(dx, dy)
+        if distance > SWEEP_STEP:
+            n_steps = math.ceil(distance / SWEEP_STEP)
+            for step in range(1, n_steps):
+                x, y = x0 + dx * step / n_steps, y0 + dy * step / n_steps
+                if self.road_status(x, y, angle) == COMPLETELY_OFF:
+                    return COMPLETELY_OFF, x, y
+        return self.road_status(x1, y1, angle), x1, y1
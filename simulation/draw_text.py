@@ -1,4 +1,5 @@
 import pygame
+from collections import OrderedDict
 
 # Try to use a modern, readable font
 def get_font(size, bold=False):
@@ -15,50 +16,98 @@ def draw_shadowed_text(window, text, font, pos, text_colour, shadow_colour=(0,0,
     surf = font.render(text, True, text_colour)
     window.blit(surf, pos)
 
-def draw_score(window, font_big, textbox_colour, text_colour, car_score):
-    font = get_font(font_big.get_height(), bold=True)
-    text = f"Score: {car_score}"
-    rect = font.render(text, True, text_colour).get_rect(topleft=(20, 20))
-    pygame.draw.rect(window, textbox_colour, rect.inflate(18, 18).move(-9, -9), border_radius=8)
-    draw_shadowed_text(window, text, font, rect.topleft, text_colour)
 
-def draw_timer(window, font_big, textbox_colour, text_colour, remaining_time, screen_width):
-    font = get_font(font_big.get_height(), bold=True)
-    text = f"Time: {remaining_time:.1f}"
-    rect = font.render(text, True, text_colour).get_rect(topright=(screen_width - 20, 20))
-    # pygame.draw.rect(window, textbox_colour, rect.inflate(18, 18).move(-9, -9), border_radius=8)
-    # draw_shadowed_text(window, text, font, rect.topleft, text_colour)
+class Hud:
+    """
+    Heads-up display drawn over the track.
+    Each widget (box, shadow and text) is rendered once into a surface and kept in
+    an LRU cache keyed by its text and style, so a frame only re-renders widgets whose
+    value changed and otherwise just blits cached surfaces. The controls line is
+    pre-rendered once. Fonts are loaded once per Hud, since SysFont searches the
+    system fonts on every call; they belong to the session that created the Hud
+    and must not outlive its pygame.quit().
+    """
+    SHADOW_OFFSET = 2
 
-def draw_speed(window, font_big, textbox_colour, text_colour, car_speed, screen_width, screen_height):
-    font = get_font(font_big.get_height(), bold=True)
-    text = f"Speed: {car_speed:.1f}"
-    rect = font.render(text, True, text_colour).get_rect(bottomright=(screen_width - 20, screen_height - 20))
-    pygame.draw.rect(window, textbox_colour, rect.inflate(18, 18).move(-9, -9), border_radius=8)
-    draw_shadowed_text(window, text, font, rect.topleft, text_colour)
+    def __init__(self, font_small, textbox_colour, text_colour, screen_width, screen_height, cache_size=256):
+        self.textbox_colour = textbox_colour
+        self.text_colour = text_colour
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.font_size = font_small.get_height()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._widgets = {}  # Widget name -> ((text, colour), surface) drawn last frame
+        self._fonts = {}  # bold -> Font
+        controls_font = pygame.font.SysFont(None, 24)
+        self.controls = controls_font.render("[E]:End Simulation | [R]:Restart Episode", True, (128,128,128))
 
-def draw_sensor_values(window, font_small, textbox_colour, text_colour, car_sensors, screen_width, screen_height):
-    font = get_font(font_small.get_height())
-    base_x = screen_width - 20
-    base_y = screen_height - 80
-    for idx, sensor in enumerate(reversed(car_sensors)):
-        label = f"Sensor {len(car_sensors) - idx}: {sensor.distance:.1f}"
-        surf = font.render(label, True, text_colour)
-        rect = surf.get_rect(bottomright=(base_x, base_y - idx * 28))
-        pygame.draw.rect(window, textbox_colour, rect.inflate(14, 14).move(-7, -7), border_radius=6)
-        draw_shadowed_text(window, label, font, rect.topleft, text_colour)
+    def _render_widget(self, text, bold, padding, border_radius, text_colour):
+        """Box, shadow and text composited into one surface, offset by its padding."""
+        font = self._fonts.get(bold)
+        if font is None:
+            font = self._fonts[bold] = get_font(self.font_size, bold=bold)
+        text_surf = font.render(text, True, text_colour)
+        width, height = text_surf.get_size()
+        # The box is inflated around the text and moved up-left by half the padding,
+        # and the shadow may stick out of its bottom-right corner
+        surf = pygame.Surface((width + padding + self.SHADOW_OFFSET, height + padding + self.SHADOW_OFFSET), pygame.SRCALPHA)
+        pygame.draw.rect(surf, self.textbox_colour, pygame.Rect(0, 0, width + padding, height + padding), border_radius=border_radius)
+        draw_shadowed_text(surf, text, font, (padding, padding), text_colour)
+        return surf, (width, height)
 
-def draw_car_status(window, font_small, textbox_colour, text_colour, is_on_track, car_angle, screen_width, screen_height):
-    font = get_font(font_small.get_height())
-    base_x = screen_width - 20
-    base_y = screen_height - 250
-    status = None #"On Track: Yes" if is_on_track else "On Track: No"
-    angle = None # f"Angle: {car_angle:.1f}°"
-    status_surf = font.render(status, True, text_colour)
-    status_rect = status_surf.get_rect(bottomright=(base_x, base_y))
-    pygame.draw.rect(window, textbox_colour, status_rect.inflate(14, 14).move(-7, -7), border_radius=6)
-    draw_shadowed_text(window, status, font, status_rect.topleft, text_colour)
+    def _get_widget(self, text, bold, padding, border_radius, text_colour):
+        key = (text, bold, padding, border_radius, text_colour)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        widget = self._render_widget(text, bold, padding, border_radius, text_colour)
+        self._cache[key] = widget
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return widget
 
-    angle_surf = font.render(angle, True, text_colour)
-    angle_rect = angle_surf.get_rect(bottomright=(base_x, base_y + 30))
-    pygame.draw.rect(window, textbox_colour, angle_rect.inflate(14, 14).move(-7, -7), border_radius=6)
-    draw_shadowed_text(window, angle, font, angle_rect.topleft, text_colour)
\ No newline at end of file
+    def _draw_widget(self, window, name, text, anchor, pos, bold=False, padding=14, border_radius=6, text_colour=None):
+        text_colour = text_colour or self.text_colour
+        last = self._widgets.get(name)
+        if last is not None and last[0] == (text, text_colour):
+            surf, text_size = last[1]
+        else:
+            surf, text_size = self._get_widget(text, bold, padding, border_radius, text_colour)
+            self._widgets[name] = ((text, text_colour), (surf, text_size))
+        text_rect = pygame.Rect((0, 0), text_size)
+        setattr(text_rect, anchor, pos)
+        return window.blit(surf, (text_rect.x - padding, text_rect.y - padding))
+
+    def draw(self, window, car, remaining_time):
+        """Draw every widget and return the screen rects they cover."""
+        width, height = self.screen_width, self.screen_height
+        rects = [
+            self._draw_widget(window, "score", f"Score: {car.score}", "topleft", (20, 20),
+                              bold=True, padding=18, border_radius=8),
+            self._draw_widget(window, "speed", f"Speed: {car.speed:.1f}", "bottomright", (width - 20, height - 20),
+                              bold=True, padding=18, border_radius=8),
+        ]
+        n_sensors = len(car.sensors)
+        for idx, sensor in enumerate(reversed(car.sensors)):
+            label = f"Sensor {n_sensors - idx}: {sensor.distance:.1f}"
+            rects.append(self._draw_widget(window, f"sensor_{idx}", label, "bottomright",
+                                           (width - 20, height - 80 - idx * 28)))
+        # Car status boxes are kept as empty placeholders, as before
+        rects.append(self._draw_widget(window, "status", None, "bottomright", (width - 20, height - 250)))
+        rects.append(self._draw_widget(window, "angle", None, "bottomright", (width - 20, height - 220)))
+        rects.append(window.blit(self.controls, (10, height - 30)))
+        return rects
+
+    def draw_scoreboard(self, window, rows):
+        """
+        Draw one score line per car, in the car's colour, instead of the single-car HUD.
+        rows holds (label, colour, score, collided) tuples. Returns the screen rects drawn.
+        """
+        rects = []
+        for idx, (label, colour, score, collided) in enumerate(rows):
+            text = f"{label}: {score}" + (" (crashed)" if collided else "")
+            rects.append(self._draw_widget(window, f"scoreboard_{idx}", text, "topleft", (20, 20 + idx * 30),
+                                           bold=True, text_colour=tuple(colour)))
+        rects.append(window.blit(self.controls, (10, self.screen_height - 30)))
+        return rects
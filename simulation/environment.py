@@ -1,34 +1,67 @@
 import os
 import pygame
-import math
-from simulation_settings import WINDOW_SETTINGS, COLOUR_SETTINGS, FONT_SETTINGS
+import numpy as np
+from simulation_settings import WINDOW_SETTINGS, COLOUR_SETTINGS, FONT_SETTINGS, SESSION_SETTINGS, TRACK_SETTINGS
+from simulation.clock import SimulationClock
+from simulation.track_grid import OFF_ROAD
+from simulation.track_cache import load_track, load_track_surface
+from simulation.raycast import RayCaster
+from simulation.checkpoint import CheckpointIndex
+from simulation.profiler import make_profiler
+from simulation.renderer import Renderer
 
 
-from simulation.draw_text import (
-    draw_score, draw_timer, draw_speed, draw_sensor_values, draw_car_status
-)
+from simulation.draw_text import Hud
 
 class Environment:
-    def __init__(self, track_filename=None):
+    def __init__(self, track_filename=None, headless=False):
+        self.headless = headless
+        self.clock = SimulationClock(SESSION_SETTINGS["STEPS_PER_SECOND"])
+        self.profiler = make_profiler(SESSION_SETTINGS["PROFILE"])
         self._init_screen_settings()
         self._init_colours()
-        self._init_fonts()
-        self.window = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        pygame.display.set_caption("Simulation")
-        self.TRACK_IMAGE = self._load_track_image(track_filename)
+        if headless:
+            # No display surface: the track is only used for pixel lookups
+            self.window = None
+        else:
+            self._init_fonts()
+            self.hud = Hud(self.FONT_SMALL, self.TEXTBOX_COLOUR, self.TEXT_COLOUR, self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
+            self.window = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+            pygame.display.set_caption("Simulation")
+        track_path = self._track_path(track_filename)
+        # Headless runs only need the compiled grid, never the image itself
+        self.TRACK_IMAGE = None if headless else load_track_surface(
+            track_path, self.SCREEN_WIDTH, self.SCREEN_HEIGHT, convert=True
+        )
+        self._init_track_grid(track_path)
+        self.renderer = None if headless else Renderer(self)
 
-    def _load_track_image(self, track_filename):
+    def _track_path(self, track_filename):
         project_root = os.path.dirname(os.path.abspath(__file__))
         tracks_dir = os.path.join(project_root, "..", "tracks")
         if track_filename is not None:
             img_path = os.path.join(tracks_dir, track_filename)
         else:
             img_path = os.path.join(tracks_dir, "track_3.png")
-        img_path = os.path.normpath(img_path)
-        return pygame.transform.scale(
-            pygame.image.load(img_path).convert(),
-            (self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
+        return os.path.normpath(img_path)
+
+    def _init_track_grid(self, track_path):
+        # The track is labelled once and cached on disk, so road, sensor and
+        # checkpoint queries are array lookups and later sessions skip the preprocessing
+        bundle = load_track(
+            track_path, self.SCREEN_WIDTH, self.SCREEN_HEIGHT,
+            (self.ROAD_COLOUR, self.CHECKPOINT_COLOUR, self.START_COLOUR),
+            with_distance_field=TRACK_SETTINGS["DISTANCE_FIELD"],
         )
+        self.TRACK_GRID = bundle["labels"]
+        self.ROAD_MASK = self.TRACK_GRID != OFF_ROAD
+        self.CHECKPOINT_SEGMENTS = bundle["checkpoint_segments"]
+        self.DISTANCE_FIELD = bundle.get("distance_field")
+        x, y, angle = bundle["start_pose"].tolist()
+        self.START_POSE = None if np.isnan(x) else (int(x), int(y), angle)
+        # Sensors are sphere-traced over the distance field when it is compiled, marched otherwise
+        self.ray_caster = RayCaster(self.ROAD_MASK, distance_field=self.DISTANCE_FIELD)
+        self.checkpoint_index = CheckpointIndex.from_environment(self)
 
     def _init_screen_settings(self):
         self.SCREEN_WIDTH = WINDOW_SETTINGS["WIDTH"]
@@ -50,18 +83,23 @@ class Environment:
         self.FONT_BIG = pygame.font.Font(None, FONT_SETTINGS["BIG"])
         self.FONT_SMALL = pygame.font.Font(None, FONT_SETTINGS["SMALL"])
 
+    def is_road(self, x, y):
+        """Check if the given position is on the road (road, checkpoint or start)."""
+        if 0 <= x < self.SCREEN_WIDTH and 0 <= y < self.SCREEN_HEIGHT:
+            return bool(self.ROAD_MASK[int(y), int(x)])
+        return False
+
+    def is_road_array(self, xs, ys):
+        """Vectorised is_road for arrays of positions."""
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        inside = (xs >= 0) & (xs < self.SCREEN_WIDTH) & (ys >= 0) & (ys < self.SCREEN_HEIGHT)
+        rows = np.where(inside, ys, 0).astype(np.intp)
+        cols = np.where(inside, xs, 0).astype(np.intp)
+        return inside & self.ROAD_MASK[rows, cols]
+
     def find_start_position(self):
-        width, height = self.TRACK_IMAGE.get_width(), self.TRACK_IMAGE.get_height()
-        for y in range(height):
-            for x in range(width):
-                if self.TRACK_IMAGE.get_at((x, y)) == self.START_COLOUR:
-                    for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < width and 0 <= ny < height:
-                            if self.TRACK_IMAGE.get_at((nx, ny)) == self.ROAD_COLOUR:
-                                angle = math.degrees(math.atan2(-dy, dx))
-                                return x, y, angle
-        return None
+        """Start (x, y, angle) compiled with the track, None if it has no start."""
+        return self.START_POSE
 
     def draw_track(self):
         self.window.blit(self.TRACK_IMAGE, (0, 0))
@@ -71,12 +109,4 @@ class Environment:
         self.window.fill(self.BACKGROUND_COLOUR, rect)
 
     def draw_text(self, car, remaining_time):
-        draw_score(self.window, self.FONT_SMALL, self.TEXTBOX_COLOUR, self.TEXT_COLOUR, car.score)
-        draw_timer(self.window, self.FONT_SMALL, self.TEXTBOX_COLOUR, self.TEXT_COLOUR, remaining_time, self.SCREEN_WIDTH)
-        draw_speed(self.window, self.FONT_SMALL, self.TEXTBOX_COLOUR, self.TEXT_COLOUR, car.speed, self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
-        draw_sensor_values(self.window, self.FONT_SMALL, self.TEXTBOX_COLOUR, self.TEXT_COLOUR, car.sensors, self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
-        on_track = car.check_road_status(car.x, car.y) != "completely_off"
-        draw_car_status(self.window, self.FONT_SMALL, self.TEXTBOX_COLOUR, self.TEXT_COLOUR, on_track, car.angle, self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
-        font = pygame.font.SysFont(None, 24)
-        controls = font.render("[E]:End Simulation | [R]:Restart Episode", True, (128,128,128))
-        self.window.blit(controls, (10, self.SCREEN_HEIGHT - 30))
+        return self.hud.draw(self.window, car, remaining_time)
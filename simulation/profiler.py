@@ -0,0 +1,117 @@
+import os
+import json
+import time
+from collections import defaultdict
+import numpy as np
+
+PROFILE_LOG = os.path.join("q_learning_logs", "profile.jsonl")
+
+
+class NullProfiler:
+    """Profiler that records nothing; used unless SESSION_SETTINGS["PROFILE"] is on."""
+    enabled = False
+
+    def start(self):
+        return 0
+
+    def stop(self, phase, started):
+        pass
+
+    def record(self, phase, started):
+        pass
+
+    def count(self, counter, n=1):
+        pass
+
+    def end_step(self):
+        pass
+
+    def start_episode(self):
+        pass
+
+    def end_episode(self, episode, q_table_size=None, **fields):
+        return None
+
+
+class StepProfiler:
+    """
+    Per-phase timers for the simulation loop.
+    Code around a phase calls started = profiler.start() and profiler.stop(name, started);
+    times add up within a step, and end_step records one sample per phase. end_episode
+    summarises the samples (mean, p50 and p99 per step, in microseconds), steps per
+    second and Q-table size, and appends them as one JSON line to the profile log.
+    """
+    enabled = True
+
+    def __init__(self, log_path=PROFILE_LOG):
+        self.log_path = log_path
+        if log_path:
+            os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        self.start_episode()
+
+    def start(self):
+        return time.perf_counter_ns()
+
+    def stop(self, phase, started):
+        self._step[phase] += time.perf_counter_ns() - started
+
+    def record(self, phase, started):
+        """Record a phase that runs outside the step loop, such as a save, as its own sample."""
+        self._samples[phase].append(time.perf_counter_ns() - started)
+
+    def count(self, counter, n=1):
+        self._counters[counter] += n
+
+    def end_step(self):
+        self._steps += 1
+        for phase, elapsed in self._step.items():
+            self._samples[phase].append(elapsed)
+        self._step.clear()
+
+    def start_episode(self):
+        self._step = defaultdict(int)  # Nanoseconds per phase in the current step
+        self._samples = defaultdict(list)  # Nanoseconds per phase, one entry per step it ran in
+        self._counters = defaultdict(int)
+        self._steps = 0
+        self._started = time.perf_counter()
+
+    def end_episode(self, episode, q_table_size=None, **fields):
+        """Summarise the episode, append it to the profile log and start a new one."""
+        wall_time = time.perf_counter() - self._started
+        phases = {}
+        for phase, samples in self._samples.items():
+            samples = np.array(samples, dtype=np.float64) / 1000  # Microseconds
+            phases[phase] = {
+                "steps": len(samples),
+                "mean_us": round(float(samples.mean()), 2),
+                "p50_us": round(float(np.percentile(samples, 50)), 2),
+                "p99_us": round(float(np.percentile(samples, 99)), 2),
+                "total_ms": round(float(samples.sum()) / 1000, 3),
+            }
+        summary = {
+            "time": time.time(),
+            "episode": episode,
+            "steps": self._steps,
+            "wall_time_s": round(wall_time, 4),
+            "steps_per_sec": round(self._steps / wall_time, 1) if wall_time > 0 else None,
+            "q_table_size": q_table_size,
+            "phases": phases,
+            "counters": dict(self._counters),
+            **fields,
+        }
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(summary) + "\n")
+        self.start_episode()
+        return summary
+
+
+def make_profiler(enabled, log_path=PROFILE_LOG):
+    return StepProfiler(log_path) if enabled else NullProfiler()
+
+
+def format_summary(summary, top=4):
+    """One line with steps/sec and the most expensive phases, for printing after an episode."""
+    phases = sorted(summary["phases"].items(), key=lambda item: item[1]["total_ms"], reverse=True)[:top]
+    breakdown = ", ".join(f"{name} {stats['mean_us']:.0f}us (p99 {stats['p99_us']:.0f})" for name, stats in phases)
+    return f"{summary['steps_per_sec']} steps/s | {breakdown}"
@@ -0,0 +1,142 @@
+import math
+import numpy as np
+
+# Cell values of the padded sensor field
+OFF_ROAD_CELL = 0
+ROAD_CELL = 1
+OUTSIDE_CELL = 2  # Outside the screen: skipped by the sensors, like in Sensor.make_sensor_distance
+
+
+class RayCaster:
+    """
+    Answers "distance to the first non-road pixel along a ray" for the car sensors.
+    The road mask is copied once per track into a field padded by max_length cells,
+    so every probe of every ray is a single flat array lookup.
+
+    Given the track's distance field (see track_grid.distance_field), rays starting on
+    the road are sphere-traced: a probed pixel at distance d from the nearest off-road
+    pixel lets the ray skip floor(d - sqrt(2)) steps, since truncating two points k
+    steps apart to pixels moves them less than k + sqrt(2) apart. Near the edge the
+    ray probes every step, so distances are exactly those of the plain march. Rays
+    starting off the road, and large batches, are marched.
+    """
+    CHUNK = 32  # Steps probed per pass before finished rays are dropped
+    SINGLE_PASS_RAYS = 64  # Up to this many rays, one full-length pass is cheaper than chunking
+    SPHERE_TRACE_RAYS = 64  # Up to this many rays, tracing each in Python beats a vectorised march
+
+    def __init__(self, road_mask, max_length=256, distance_field=None):
+        self.max_length = int(max_length)
+        height, width = road_mask.shape
+        pad = self.max_length + 1
+        self.pad = pad
+        self.field = np.full((height + 2 * pad, width + 2 * pad), OUTSIDE_CELL, dtype=np.uint8)
+        self.field[pad:pad + height, pad:pad + width] = road_mask
+        self.flat_field = self.field.ravel()
+        self.stride = self.field.shape[1]
+        self.origin = pad * self.stride + pad  # Flat index of screen pixel (0, 0)
+        self.steps = np.arange(self.max_length, dtype=np.float64)
+        self.cells = None
+        self.skips = None
+        if distance_field is not None:
+            # Steps to advance from each cell, 1 off the road and outside the screen.
+            # bytes index faster than NumPy arrays from a Python loop.
+            skips = np.ones(self.field.shape, dtype=np.uint8)
+            # floor(d - sqrt(2)) + 1, at least 1; the cast truncates, which floors the positives
+            skips[pad:pad + height, pad:pad + width] = np.clip(distance_field - (math.sqrt(2) - 1), 1, 255)
+            self.skips = skips.tobytes()
+            self.cells = self.flat_field.tobytes()
+
+    def _trace(self, x, y, cos, sin, length):
+        """Sphere-trace one ray from an on-road origin; returns its distance."""
+        cells, skips, stride, origin = self.cells, self.skips, self.stride, self.origin
+        step = 0
+        while step < length:
+            # int() truncates toward zero, like the march
+            index = origin + int(y - step * sin) * stride + int(x + step * cos)
+            if cells[index] == OFF_ROAD_CELL:
+                return step
+            step += skips[index]
+        return length
+
+    def distance(self, x, y, angle, length, on_road):
+        """Distance along a single ray, as cast would return it, without array overhead."""
+        if self.skips is None or not on_road:
+            return int(self.cast(x, y, [angle], [length], on_road)[0])
+        if length > self.max_length:
+            raise ValueError(f"Ray length {length} exceeds the caster's max_length {self.max_length}")
+        rad = math.radians(angle)
+        return self._trace(x, y, math.cos(rad), math.sin(rad), length)
+
+    def distances(self, x, y, angles, lengths, on_road):
+        """
+        cast for the rays of one car, from lists of angles and lengths to a list of
+        distances. Traced on the road without any array set-up, the common case.
+        """
+        if self.skips is None or not on_road:
+            return self.cast(x, y, angles, lengths, on_road).tolist()
+        if max(lengths) > self.max_length:
+            raise ValueError(f"Ray length {max(lengths)} exceeds the caster's max_length {self.max_length}")
+        trace, radians, cos, sin = self._trace, math.radians, math.cos, math.sin
+        return [trace(x, y, cos(radians(angle)), sin(radians(angle)), length) for angle, length in zip(angles, lengths)]
+
+    def cast(self, x, y, angles, lengths, on_road):
+        """
+        Cast all rays in one call.
+        :param x, y: Ray origin(s), scalars or arrays of shape S.
+        :param angles: Ray angles in degrees, shape S + (n_rays,).
+        :param lengths: Ray lengths in pixels, shape (n_rays,).
+        :param on_road: Whether each origin is on the road, scalar or shape S.
+        :return: Distances with the same semantics as Sensor.make_sensor_distance:
+                 the step of the first off-road pixel (or the length if none) when
+                 on the road, minus the step of the first road pixel (or 0) when off it.
+        """
+        lengths = np.asarray(lengths)
+        if int(lengths.max()) > self.max_length:
+            raise ValueError(f"Ray length {int(lengths.max())} exceeds the caster's max_length {self.max_length}")
+
+        rad = np.radians(angles)
+        shape = rad.shape
+        on_road = np.broadcast_to(np.asarray(on_road, dtype=bool)[..., None], shape).ravel()
+        ray_x = np.broadcast_to(np.asarray(x, dtype=np.float64)[..., None], shape).ravel()
+        ray_y = np.broadcast_to(np.asarray(y, dtype=np.float64)[..., None], shape).ravel()
+        ray_cos = np.cos(rad).ravel()
+        ray_sin = np.sin(rad).ravel()
+        ray_length = np.broadcast_to(lengths, shape).ravel()
+        target = np.where(on_road, OFF_ROAD_CELL, ROAD_CELL)
+
+        distances = np.where(on_road, ray_length, 0)
+        pending = np.arange(distances.size)
+        if self.skips is not None and distances.size <= self.SPHERE_TRACE_RAYS:
+            traced = np.flatnonzero(on_road)
+            distances[traced] = [
+                self._trace(*ray) for ray in zip(ray_x[traced].tolist(), ray_y[traced].tolist(), ray_cos[traced].tolist(),
+                                                 ray_sin[traced].tolist(), ray_length[traced].tolist())
+            ]
+            pending = np.flatnonzero(~on_road)
+            if pending.size == 0:
+                return distances.reshape(shape)
+        # March in chunks and drop rays as they hit, most rays stop well before their length
+        chunk = int(ray_length.max()) if distances.size <= self.SINGLE_PASS_RAYS else self.CHUNK
+        for start in range(0, self.max_length, chunk):
+            steps = self.steps[start:start + chunk]
+            # astype truncates toward zero, the same as int() in the scalar sensor loop
+            px = (ray_x[pending, None] + steps * ray_cos[pending, None]).astype(np.intp)
+            py = (ray_y[pending, None] - steps * ray_sin[pending, None]).astype(np.intp)
+            np.clip(px, -self.pad, self.stride - self.pad - 1, out=px)
+            np.clip(py, -self.pad, self.field.shape[0] - self.pad - 1, out=py)
+            py *= self.stride
+            py += px
+            py += self.origin
+            cells = self.flat_field.take(py)
+
+            hits = (cells == target[pending, None]) & (steps < ray_length[pending, None])
+            found = hits.any(axis=-1)
+            first = hits.argmax(axis=-1) + start
+            hit_rays = pending[found]
+            distances[hit_rays] = np.where(on_road[hit_rays], first[found], -first[found])
+
+            pending = pending[~found]
+            pending = pending[ray_length[pending] > start + chunk]
+            if pending.size == 0:
+                break
+        return distances.reshape(shape)
@@ -0,0 +1,68 @@
+import pygame
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def sensor_overlay(radius, colour):
+    """Semi-transparent sensor circle, built once per radius and colour."""
+    surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+    pygame.draw.circle(surface, colour, (radius, radius), radius)
+    return surface
+
+
+class RotatedSprites:
+    """
+    Rotations of a sprite pre-computed per angle bucket, so drawing a car is a
+    lookup and a blit instead of a transform every frame.
+    """
+    def __init__(self, image, angle_step=1):
+        self.angle_step = angle_step
+        self.n_buckets = int(round(360 / angle_step))
+        self.sprites = [pygame.transform.rotate(image, bucket * angle_step) for bucket in range(self.n_buckets)]
+
+    def get(self, angle):
+        return self.sprites[int(round(angle / self.angle_step)) % self.n_buckets]
+
+
+class Renderer:
+    """
+    Dirty-rect renderer for the simulation window.
+    The track is a static background: every frame only the areas drawn over in the
+    previous frame are restored from it, the cars and HUD are drawn on top, and just
+    the old and new rectangles are pushed to the display.
+    """
+    def __init__(self, environment):
+        self.environment = environment
+        self.window = environment.window
+        self.background = environment.TRACK_IMAGE
+        self._dirty = []  # Screen rects drawn over last frame
+        self._full_redraw = True
+
+    def invalidate(self):
+        """Redraw and flip the whole window on the next frame, e.g. at the start of an episode."""
+        self._full_redraw = True
+
+    def draw_frame(self, cars, time_left, scoreboard=None):
+        """
+        Draw the cars and update the display. The HUD shows the first car, or a
+        per-car scoreboard when scoreboard rows are given (see Hud.draw_scoreboard).
+        """
+        window = self.window
+        if self._full_redraw:
+            window.blit(self.background, (0, 0))
+        else:
+            for rect in self._dirty:
+                window.blit(self.background, rect, rect)
+
+        rects = [car.draw(window) for car in cars]
+        if scoreboard is not None:
+            rects.extend(self.environment.hud.draw_scoreboard(window, scoreboard))
+        elif cars:
+            rects.extend(self.environment.draw_text(cars[0], time_left))
+
+        if self._full_redraw:
+            pygame.display.flip()
+            self._full_redraw = False
+        else:
+            pygame.display.update(self._dirty + rects)
+        self._dirty = rects
@@ -5,8 +5,6 @@ from simulation_settings import COLOUR_SETTINGS
 class Sensor:
     def __init__(self, car, angle_offset, length):
         self.car = car
-        self.end_x = 0  
-        self.end_y = 0  
         self.angle_offset = angle_offset
         self.length = length
         self.distance = 0  # distance to the first obstacle
@@ -33,42 +31,28 @@ class Sensor:
 
     def make_sensor_distance(self, environment):
         angle_total = self.car.angle + self.angle_offset
-        rad = math.radians(angle_total)
-        found = False
-        result = self.length if self.is_on_road else 0
+        # Single-ray query; Car.update_sensors casts all sensors in one call
+        return environment.ray_caster.distance(self.car.x, self.car.y, angle_total, self.length, self.is_on_road)
 
-        # Loop through the range of the sensor's length to check for obstacles
-        for step in range(int(self.length)):
-            px = int(self.car.x + step * math.cos(rad))
-            py = int(self.car.y - step * math.sin(rad))
+    def set_reading(self, distance, is_on_road):
+        """Store a reading computed for all sensors at once."""
+        self.distance = distance
+        self.is_on_road = is_on_road
 
-            # Ensure the check is within the environment's boundaries
-            if not (0 <= px < environment.SCREEN_WIDTH and 0 <= py < environment.SCREEN_HEIGHT):
-                continue
-            pixel_colour = environment.TRACK_IMAGE.get_at((px, py))
+    @property
+    def end_x(self):
+        rad = math.radians(self.car.angle + self.angle_offset)
+        return self.car.x + self.length * math.cos(rad)
 
-            # If the car is on the road, detect the first non-road object
-            if self.is_on_road:
-                if pixel_colour not in (environment.ROAD_COLOUR, environment.CHECKPOINT_COLOUR, environment.START_COLOUR):
-                    result = step
-                    found = True
-                    break
-            # If the car is off-road, detect the distance to the road
-            else:
-                if pixel_colour in (environment.ROAD_COLOUR, environment.CHECKPOINT_COLOUR, environment.START_COLOUR):
-                    result = -step
-                    found = True
-                    break
-        return result
+    @property
+    def end_y(self):
+        rad = math.radians(self.car.angle + self.angle_offset)
+        return self.car.y - self.length * math.sin(rad)
 
     def update(self, environment):
-        # Calculate the sensor's direction in radians
-        angle_total = self.car.angle + self.angle_offset
-        rad = math.radians(angle_total)
-        # Compute endpoint
-        self.end_x = self.car.x + self.length * math.cos(rad)
-        self.end_y = self.car.y - self.length * math.sin(rad)
+        started = environment.profiler.start()
         # Determine if the car is on the road
         self.is_on_road = self.car.is_on_road(self.car.x, self.car.y)
         # Update the measured distance
         self.distance = self.make_sensor_distance(environment)
+        environment.profiler.stop("sensor.update", started)
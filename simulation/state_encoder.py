@@ -0,0 +1,66 @@
+import numpy as np
+from simulation_settings import STATE_SETTINGS
+from q_learning_implementation.q_table import FEATURE_BITS, FEATURE_OFFSET, MAX_FEATURES, unpack_state
+
+
+class StateEncoder:
+    """
+    Discretises speed, sensor distances and optionally the heading into packed
+    integer state IDs, straight from the sensor vector.
+    IDs use the same packing as q_table.pack_state, so with the default bins an ID
+    equals pack_state(car.get_state()) and existing Q-tables keep working.
+    """
+    def __init__(self, n_sensors=8, max_sensor_length=200, max_speed=None,
+                 speed_bin=None, sensor_bin=None, angle_bins=None):
+        self.speed_bin = speed_bin or STATE_SETTINGS["SPEED_BIN"]
+        self.sensor_bin = sensor_bin or STATE_SETTINGS["SENSOR_BIN"]
+        self.angle_bins = STATE_SETTINGS["ANGLE_BINS"] if angle_bins is None else angle_bins
+        self.n_sensors = n_sensors
+        self.feature_count = 1 + n_sensors + (1 if self.angle_bins else 0)
+        if self.feature_count > MAX_FEATURES:
+            raise ValueError(f"At most {MAX_FEATURES} state features can be packed, got {self.feature_count}")
+        if max_sensor_length / self.sensor_bin >= FEATURE_OFFSET:
+            raise ValueError(f"SENSOR_BIN {self.sensor_bin} gives more sensor bins than a state field holds")
+        if max_speed is not None and max_speed / self.speed_bin >= FEATURE_OFFSET:
+            raise ValueError(f"SPEED_BIN {self.speed_bin} gives more speed bins than a state field holds")
+        if not 0 <= self.angle_bins <= FEATURE_OFFSET:
+            raise ValueError(f"ANGLE_BINS must be between 0 and {FEATURE_OFFSET}, got {self.angle_bins}")
+
+        # Bit position of each feature field below the length tag
+        self._shifts = np.arange(self.feature_count - 1, -1, -1, dtype=np.uint64) * np.uint64(FEATURE_BITS)
+        self._tag = np.uint64(self.feature_count) << np.uint64(FEATURE_BITS * self.feature_count)
+
+    def bins(self, speeds, distances, angles=None):
+        """Discretised features, one row per car: (..., feature_count) ints."""
+        distances = np.asarray(distances, dtype=np.float64)
+        features = np.empty(distances.shape[:-1] + (self.feature_count,), dtype=np.int64)
+        features[..., 0] = np.trunc(np.asarray(speeds) / self.speed_bin)  # int() truncates toward zero
+        features[..., 1:1 + self.n_sensors] = np.trunc(distances / self.sensor_bin)
+        if self.angle_bins:
+            # A tiny negative angle wraps to exactly 360.0, one past the last bin
+            features[..., -1] = np.minimum(np.floor_divide(np.asarray(angles) % 360, 360 / self.angle_bins),
+                                           self.angle_bins - 1)
+        return features
+
+    def encode_batch(self, speeds, distances, angles=None):
+        """Packed state IDs (uint64) for arrays of cars."""
+        fields = np.clip(self.bins(speeds, distances, angles) + FEATURE_OFFSET, 0, 2 * FEATURE_OFFSET - 1)
+        return self._tag | np.bitwise_or.reduce(fields.astype(np.uint64) << self._shifts, axis=-1)
+
+    def encode(self, speed, distances, angle=None):
+        """
+        Packed state ID of one car, from a sequence of sensor distances.
+        Plain Python integer arithmetic beats NumPy call overhead for a single car.
+        """
+        top = 2 * FEATURE_OFFSET - 1
+        key = (self.feature_count << FEATURE_BITS) | min(max(int(speed / self.speed_bin) + FEATURE_OFFSET, 0), top)
+        for distance in distances:
+            key = (key << FEATURE_BITS) | min(max(int(distance / self.sensor_bin) + FEATURE_OFFSET, 0), top)
+        if self.angle_bins:
+            key = (key << FEATURE_BITS) | (min(int((angle % 360) // (360 / self.angle_bins)), self.angle_bins - 1)
+                                           + FEATURE_OFFSET)
+        return key
+
+    def decode(self, state_id):
+        """Discretised feature tuple of a state ID."""
+        return unpack_state(state_id)
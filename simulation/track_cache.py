@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import numpy as np
+import pygame
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_settings import WINDOW_SETTINGS, COLOUR_SETTINGS, TRACK_SETTINGS
+from simulation.track_grid import (
+    build_label_grid, find_start_pose, checkpoint_segments, distance_field, OFF_ROAD
+)
+
+# Compiled track bundles, one .npz per image, resolution and colour set:
+#   labels               (height, width) uint8 label grid
+#   start_pose           x, y, angle of the start, NaN if the track has none
+#   checkpoint_segments  (n, 4) x1, y1, x2, y2 per checkpoint stripe
+#   distance_field       (height, width) float32 distance to the road edge, optional
+# Bump FORMAT_VERSION whenever the compiled contents change, so stale bundles are rebuilt.
+FORMAT_VERSION = 1
+TRACKS_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tracks"))
+CACHE_DIR = os.path.join(TRACKS_DIR, ".cache")
+
+
+def track_colours():
+    """Road, checkpoint and start colours the label grid is built from."""
+    return COLOUR_SETTINGS["BLACK"], COLOUR_SETTINGS["GREY"], COLOUR_SETTINGS["YELLOW"]
+
+
+def bundle_path(img_path, width, height, colours, cache_dir=CACHE_DIR):
+    """
+    Cache file of a track, keyed by a hash of the image bytes, the resolution, the
+    colours and the distance field's clip.
+    """
+    digest = hashlib.sha1()
+    with open(img_path, "rb") as f:
+        digest.update(f.read())
+    digest.update(repr((FORMAT_VERSION, width, height, colours, TRACK_SETTINGS["DISTANCE_FIELD_MAX"])).encode())
+    name = os.path.splitext(os.path.basename(img_path))[0]
+    return os.path.join(cache_dir, f"{name}_{width}x{height}_{digest.hexdigest()[:16]}.npz")
+
+
+def load_track_surface(img_path, width, height, convert=False):
+    image = pygame.image.load(img_path)
+    if convert:
+        image = image.convert()  # convert() needs a display mode
+    return pygame.transform.scale(image, (width, height))
+
+
+def compile_track(img_path, width, height, colours, with_distance_field=False):
+    """Preprocess a track image into the arrays of a bundle."""
+    road, checkpoint, start = colours
+    labels = build_label_grid(load_track_surface(img_path, width, height), road, checkpoint, start)
+    start_pose = find_start_pose(labels)
+    bundle = {
+        "labels": labels,
+        "start_pose": np.array(start_pose if start_pose else (np.nan,) * 3, dtype=np.float64),
+        "checkpoint_segments": checkpoint_segments(labels),
+    }
+    if with_distance_field:
+        bundle["distance_field"] = distance_field(labels != OFF_ROAD, TRACK_SETTINGS["DISTANCE_FIELD_MAX"])
+    return bundle
+
+
+def save_bundle(path, bundle):
+    """
+    Write a bundle atomically, so a worker never reads a half-written file.
+    Each writer has its own temporary file, so processes compiling the same track at
+    once do not move each other's files; whichever rename lands last wins.
+    """
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".npz")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **bundle)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+        if not os.path.exists(path):
+            raise
+        # Lost the rename to another writer (Windows refuses to replace a file in use); its bundle is the same
+
+
+def load_track(img_path, width=None, height=None, colours=None, with_distance_field=False, cache_dir=CACHE_DIR):
+    """
+    Compiled bundle of a track image, from the cache when it has been compiled before.
+    Returns a dict of arrays (see the layout above).
+    """
+    width = width or WINDOW_SETTINGS["WIDTH"]
+    height = height or WINDOW_SETTINGS["HEIGHT"]
+    colours = tuple(tuple(colour) for colour in (colours or track_colours()))
+    path = bundle_path(img_path, width, height, colours, cache_dir)
+    if TRACK_SETTINGS["USE_CACHE"] and os.path.exists(path):
+        with np.load(path) as data:
+            bundle = {key: data[key] for key in data.files}
+        if with_distance_field and "distance_field" not in bundle:
+            bundle["distance_field"] = distance_field(bundle["labels"] != OFF_ROAD, TRACK_SETTINGS["DISTANCE_FIELD_MAX"])
+            save_bundle(path, bundle)
+        return bundle
+
+    bundle = compile_track(img_path, width, height, colours, with_distance_field)
+    if TRACK_SETTINGS["USE_CACHE"]:
+        save_bundle(path, bundle)
+    return bundle
+
+
+def main():
+    """Compile every track in tracks/ ahead of time."""
+    for filename in sorted(f for f in os.listdir(TRACKS_DIR) if f.endswith(".png")):
+        start = time.perf_counter()
+        img_path = os.path.join(TRACKS_DIR, filename)
+        width, height = WINDOW_SETTINGS["WIDTH"], WINDOW_SETTINGS["HEIGHT"]
+        bundle = compile_track(img_path, width, height, track_colours(), TRACK_SETTINGS["DISTANCE_FIELD"])
+        save_bundle(bundle_path(img_path, width, height, track_colours()), bundle)
+        print(f"{filename}: {len(bundle['checkpoint_segments'])} checkpoints, "
+              f"compiled in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
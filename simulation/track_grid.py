@@ -0,0 +1,116 @@
+import math
+import numpy as np
+import pygame
+
+# Labels stored in the track grid, one byte per pixel
+OFF_ROAD = 0
+ROAD = 1
+CHECKPOINT = 2
+START = 3
+
+
+def build_label_grid(surface, road_colour, checkpoint_colour, start_colour):
+    """
+    Label every pixel of the track surface once.
+    The grid is indexed as grid[y, x] so rows follow the screen rows.
+    """
+    pixels = pygame.surfarray.array3d(surface).transpose(1, 0, 2)  # (height, width, rgb)
+    grid = np.full(pixels.shape[:2], OFF_ROAD, dtype=np.uint8)
+    for label, colour in ((ROAD, road_colour), (CHECKPOINT, checkpoint_colour), (START, start_colour)):
+        grid[np.all(pixels == colour[:3], axis=-1)] = label
+    return np.ascontiguousarray(grid)
+
+
+def find_start_pose(grid):
+    """
+    First start pixel, in row order, next to a road pixel, as (x, y, angle) with the
+    angle pointing towards that road pixel. None if the track has no start.
+    """
+    height, width = grid.shape
+    for y, x in np.argwhere(grid == START):
+        y, x = int(y), int(x)
+        for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                if grid[ny, nx] == ROAD:
+                    angle = math.degrees(math.atan2(-dy, dx))
+                    return x, y, angle
+    return None
+
+
+def connected_components(mask):
+    """
+    8-connected components of a boolean grid, as (ys, xs) pixel arrays ordered by
+    their first pixel in row order.
+    """
+    ys, xs = np.nonzero(mask)
+    if not ys.size:
+        return []
+    index = np.full((mask.shape[0] + 2, mask.shape[1] + 2), -1, dtype=np.int64)
+    index[ys + 1, xs + 1] = np.arange(ys.size)
+    neighbours = []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dy or dx:
+                neighbour = index[ys + 1 + dy, xs + 1 + dx]
+                present = np.flatnonzero(neighbour >= 0)
+                neighbours.append((present, neighbour[present]))
+
+    # Every pixel ends up labelled with the smallest pixel index of its component
+    labels = np.arange(ys.size)
+    while True:
+        new_labels = labels.copy()
+        for pixels, neighbour in neighbours:
+            new_labels[pixels] = np.minimum(new_labels[pixels], labels[neighbour])
+        new_labels = new_labels[new_labels]  # Pointer jumping, halves the remaining iterations
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    _, inverse = np.unique(labels, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    splits = np.flatnonzero(np.diff(inverse[order])) + 1
+    return [(ys[group], xs[group]) for group in np.split(order, splits)]
+
+
+def checkpoint_segments(grid):
+    """
+    One line segment per checkpoint stripe, (n, 4) as x1, y1, x2, y2: the stripe's
+    principal axis through its centre, spanning its pixels (at pixel centres).
+    """
+    segments = []
+    for ys, xs in connected_components(grid == CHECKPOINT):
+        points = np.column_stack([xs, ys]).astype(np.float64) + 0.5
+        centre = points.mean(axis=0)
+        if len(points) > 1:
+            axis = np.linalg.svd(points - centre, full_matrices=False)[2][0]
+        else:
+            axis = np.array([1.0, 0.0])
+        projections = (points - centre) @ axis
+        segments.append(np.concatenate([centre + axis * projections.min(), centre + axis * projections.max()]))
+    return np.array(segments, dtype=np.float64).reshape(-1, 4)
+
+
+def distance_field(road_mask, max_distance=256):
+    """
+    Euclidean distance from every pixel to the nearest off-road pixel, with the area
+    outside the screen counted as off-road. Exact up to max_distance, clipped above it.
+    """
+    height, width = road_mask.shape
+    cols = np.arange(width)
+    # Distance along each row: nearest off-road pixel to the left and to the right
+    left = np.maximum.accumulate(np.where(road_mask, -1, cols), axis=1)
+    right = np.minimum.accumulate(np.where(road_mask, width, cols)[:, ::-1], axis=1)[:, ::-1]
+    row_distance = np.minimum(np.minimum(cols - left, right - cols), max_distance + 1).astype(np.float64)
+    row_squared = row_distance ** 2
+
+    # Combine the rows above and below, nearest first, until no pixel can improve
+    rows = np.arange(height)
+    edge = np.minimum(rows + 1, height - rows).astype(np.float64) ** 2
+    best = np.minimum(row_squared, edge[:, None])
+    for dy in range(1, min(height, max_distance + 1)):
+        if dy * dy >= best.max():
+            break
+        np.minimum(best[dy:], row_squared[:-dy] + dy * dy, out=best[dy:])
+        np.minimum(best[:-dy], row_squared[dy:] + dy * dy, out=best[:-dy])
+    return np.minimum(np.sqrt(best), max_distance).astype(np.float32)
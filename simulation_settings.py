@@ -15,16 +15,69 @@ QL_SETTINGS = {
     "LEARNING_RATE": 0.5,  # Alpha: learning rate for Q-learning updates
     "DISCOUNT_FACTOR": 0.95,  # Gamma: how much to discount future rewards
     "EXPLORATION_RATE": 1.0,  # Epsilon: initial exploration rate
-    "EXPLORATION_DECAY": 0.995,  # How fast to decay epsilon over episodes
+    "EXPLORATION_DECAY": 0.995,  # How fast to decay epsilon per unit, for the exponential schedule
+    "EXPLORATION_SCHEDULE": "exponential",  # "exponential", "linear" or "cosine" fall from EXPLORATION_RATE to MIN_EXPLORATION_RATE
+    "EXPLORATION_UNIT": "episode",  # What the schedule counts: "episode" or "step"
+    "EXPLORATION_DURATION": 500,  # Units the linear and cosine schedules take to reach the minimum
     "MIN_EXPLORATION_RATE": 0.1,  # Minimum exploration rate (to always explore a little)
-    "Q_TABLE_FILENAME": "q_table.json"  # Agent 'knowledge' filename
+    "Q_TABLE_FILENAME": "q_table.qtb",  # Agent 'knowledge' filename (.qtb binary or .json)
+    "REPLAY_BUFFER_SIZE": 0,  # Transitions kept for experience replay, 0 to learn online only
+    "REPLAY_BATCH_SIZE": 32,  # Transitions replayed per batched update
+    "REPLAY_EVERY": 4,  # Steps between batched replay updates, 0 to replay only when asked
+    "REPLAY_PRIORITISED": False,  # Sample transitions by TD error instead of uniformly
+    "REPLAY_ALPHA": 0.6,  # How strongly priorities skew sampling
+    "REPLAY_BETA": 0.4,  # How much importance weights correct that skew
+    "AGENT_BACKEND": "q_table"  # "q_table" for the tabular agent, "tile_coding" for the linear one
+}
+
+TILE_CODING_SETTINGS = {
+    "TILINGS": 8,              # Offset tilings, each one active tile per state
+    "TILES_PER_DIMENSION": 6,  # Tiles across the range of each state feature
+    "MEMORY_PER_TILING": 4096, # Hashed weight rows per tiling, fixed however large the state space
+    "SEED": 0,                 # Seed of the tile hash
+    "WEIGHTS_FILENAME": "tile_weights.npz"  # Linear agent 'knowledge' filename
 }
 
 SESSION_SETTINGS = {
     "TRAINING_MODE": True,    # Toggle between training and evaluation modes
     "NUM_EPISODES": 50,       # Number of episodes to run
     "EPISODE_DURATION": 10,   # Duration of each episode in seconds
-    "MANUAL_CONTROL": False   # Enable manual control with arrow keys
+    "MANUAL_CONTROL": False,  # Enable manual control with arrow keys
+    "HEADLESS": False,        # Train without a window, rendering or frame cap
+    "NUM_CARS": 1,            # Cars sharing the agent in each headless episode, stepped together as a CarBatch (pays off from a few dozen)
+    "STEPS_PER_SECOND": 240,  # Simulation steps per second of episode time
+    "SAVE_EVERY_EPISODES": 5, # Episodes between background Q-table saves
+    "PROFILE": False,         # Time each phase of the simulation loop into q_learning_logs/profile.jsonl
+    "LIVE_PLOT": False,       # Open the live progress dashboard while training
+    "TEXT_LOG": False,        # Also append each score to the old one-score-per-line .txt log
+    "SEED": None,             # Seed of a fresh training run, None for a different run each time
+    "RESUME": True            # Continue training from the checkpoint saved with the Q-table
+}
+
+STATE_SETTINGS = {
+    "SPEED_BIN": 1,        # Speed units per state bin
+    "SENSOR_BIN": 10,      # Sensor pixels per state bin
+    "ANGLE_BINS": 0        # Heading bins over 360 degrees, 0 to leave the heading out of the state
+}
+
+PARALLEL_SETTINGS = {
+    "NUM_WORKERS": 4,      # Worker processes, each with its own headless Environment and Car
+    "SYNC_INTERVAL": 5,    # Episodes each worker runs between Q-table merges
+    "TRACKS": []           # Tracks to spread over the workers, empty for every track in tracks/
+}
+
+TRACK_SETTINGS = {
+    "USE_CACHE": True,            # Compile each track once into tracks/.cache and reuse it
+    "DISTANCE_FIELD": True,       # Also compile the distance from every pixel to the road edge, to sphere-trace the sensors
+    "DISTANCE_FIELD_MAX": 256     # Distances above this are clipped
+}
+
+COMPARISON_SETTINGS = {
+    "Q_TABLES": [],           # Q-table files in q_learning_implementation/q_tables to compare, empty for Q_TABLE_FILENAME
+    "SEEDS": [0],             # One car per Q-table and seed
+    "EXPLORATION_RATE": 0.0,  # Epsilon of the compared cars; above 0 each seed takes different random actions
+    "CAR_COLOURS": [(255, 0, 0), (0, 0, 255), (0, 170, 0), (255, 140, 0),
+                    (160, 32, 240), (0, 200, 200), (255, 20, 147), (139, 69, 19)]
 }
 
 WINDOW_SETTINGS = {
@@ -0,0 +1,65 @@
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)  # Tracks and their cache are found relative to the project
+
+import numpy as np
+import pytest
+
+from simulation.environment import Environment
+from simulation.car import Car
+from simulation.car_batch import CarBatch
+
+N_CARS = 8
+STEPS = 1500
+
+
+@pytest.fixture(scope="module", params=["track_1.png", "track_2.png"])
+def environment(request):
+    return Environment(request.param, headless=True)
+
+
+def test_car_batch_matches_car(environment):
+    """Every car of a CarBatch moves, senses and scores exactly like a Car given the same actions."""
+    rng = np.random.default_rng(0)
+    environment.clock.reset()
+    cars = [Car(environment) for _ in range(N_CARS)]
+    batch = CarBatch(environment, N_CARS, cars[0].state_encoder)
+    assert batch.get_state_ids().tolist() == [car.get_state_id() for car in cars]
+
+    for step in range(STEPS):
+        actions = rng.integers(0, 4, N_CARS)
+        actions[rng.random(N_CARS) < 0.5] = 0  # Mostly accelerate, so cars get around the track
+        batch.step(actions)
+        rewards = batch.calculate_reward()
+        for i, car in enumerate(cars):
+            if car.collided:
+                assert batch.collided[i] and rewards[i] == 0
+                continue
+            car.handle_agent_action(int(actions[i]))
+            reward = car.calculate_reward()
+            assert (car.x, car.y, car.angle, car.speed) == pytest.approx(
+                (batch.x[i], batch.y[i], batch.angle[i], batch.speed[i]), abs=1e-9), f"step {step}, car {i}"
+            assert car.collided == batch.collided[i], f"step {step}, car {i}"
+            assert list(car.sensor_distances) == batch.sensor_distances[i].tolist(), f"step {step}, car {i}"
+            assert reward == pytest.approx(rewards[i]) and car.score == pytest.approx(batch.score[i])
+            assert (car.checkpoints_hit, car.lap) == (batch.checkpoints_hit[i], batch.lap[i])
+            assert car.get_state_id() == int(batch.get_state_ids()[i])
+        if batch.collided.all():
+            break
+
+
+def test_reset_reads_the_first_state(environment):
+    """A reset batch starts from fresh sensor readings, as Car.reset does."""
+    environment.clock.reset()
+    car = Car(environment)
+    batch = CarBatch(environment, 2, car.state_encoder)
+    for _ in range(50):
+        batch.step([0, 0])
+    batch.reset(np.array([True, False]))
+    car.reset()
+    assert batch.sensor_distances[0].tolist() == list(car.sensor_distances)
+    assert int(batch.get_state_ids()[0]) == car.get_state_id()
@@ -0,0 +1,51 @@
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+import numpy as np
+import pytest
+
+from simulation.checkpoint import CheckpointIndex, NO_GATE
+
+N_GATES = 40
+MOVES = 5000
+
+
+def crossed_any_gate(index, x0, y0, x1, y1):
+    """Gates crossed forward by the move, testing every gate of the track."""
+    crossed = set()
+    for gate, (ax, ay, bx, by) in enumerate(index.gates.tolist()):
+        rx, ry = bx - ax, by - ay
+        if rx * (y0 - ay) - ry * (x0 - ax) < 0 <= rx * (y1 - ay) - ry * (x1 - ax):
+            along = ((x0 - ax) * (y1 - y0) - (y0 - ay) * (x1 - x0)) / (rx * (y1 - y0) - ry * (x1 - x0))
+            if 0 <= along <= 1:
+                crossed.add(gate)
+    return crossed
+
+
+@pytest.mark.parametrize("reach", [1.5, 80.0])
+def test_crossed_gate_finds_every_crossing(reach):
+    """Moves up to reach long, several cells for a fast car, never step over a gate."""
+    rng = np.random.default_rng(0)
+    centres = rng.uniform((100, 100), (800, 500), (N_GATES, 2))
+    angles = rng.uniform(0, np.pi, N_GATES)
+    ends = 30 * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    index = CheckpointIndex(np.hstack([centres - ends, centres + ends]), reach=reach)
+    # Start next to gate centres so most moves are near a gate
+    centres = (index.gates[:, :2] + index.gates[:, 2:]) / 2
+    start = centres[rng.integers(0, index.n_gates, MOVES)] + rng.uniform(-reach, reach, (MOVES, 2))
+    angle = rng.uniform(0, 2 * np.pi, MOVES)
+    length = rng.uniform(0, reach, MOVES)
+    end = start + length[:, None] * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+    crossed = index.crossed_gates(start[:, 0], start[:, 1], end[:, 0], end[:, 1])
+    hits = 0
+    for move in range(MOVES):
+        expected = crossed_any_gate(index, *start[move], *end[move])
+        gate = index.crossed_gate(*start[move], *end[move])
+        assert (gate in expected) if expected else gate == NO_GATE, f"move {move}"
+        assert (crossed[move] in expected) if expected else crossed[move] == NO_GATE, f"move {move}"
+        hits += bool(expected)
+    assert hits > MOVES // 20
@@ -0,0 +1,39 @@
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)  # Tracks and their cache are found relative to the project
+
+import numpy as np
+import pytest
+
+from simulation.environment import Environment
+from simulation.car import Car
+from simulation.raycast import RayCaster
+from simulation.track_grid import ROAD
+
+POSES = 3000
+
+
+@pytest.fixture(scope="module", params=["track_1.png", "track_2.png"])
+def environment(request):
+    return Environment(request.param, headless=True)
+
+
+def test_sphere_trace_matches_march(environment):
+    """Sensor distances traced over the distance field equal those of the per-pixel march."""
+    assert environment.ray_caster.skips is not None, "the track was compiled without a distance field"
+    marcher = RayCaster(environment.ROAD_MASK)
+    car = Car(environment)
+    offsets, lengths = car.sensor_offsets.tolist(), car.sensor_lengths.tolist()
+
+    rng = np.random.default_rng(0)
+    ys, xs = np.nonzero(environment.TRACK_GRID == ROAD)
+    picks = rng.choice(len(xs), POSES)
+    for x, y, angle in zip((xs[picks] + rng.random(POSES)).tolist(), (ys[picks] + rng.random(POSES)).tolist(),
+                           rng.uniform(0, 360, POSES).tolist()):
+        angles = [angle + offset for offset in offsets]
+        expected = marcher.cast(x, y, angles, lengths, True).tolist()
+        assert environment.ray_caster.distances(x, y, angles, lengths, True) == expected, (x, y, angle)
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+
+from simulation_settings import (SESSION_SETTINGS, QL_SETTINGS, CAR_SETTINGS, STATE_SETTINGS,
+                                 TILE_CODING_SETTINGS, PARALLEL_SETTINGS, TRACK_SETTINGS)
+
+TRACKS_DIR = os.path.join(PROJECT_ROOT, "tracks")
+
+# Settings a config file (or --set) may change, by the name of their dict in simulation_settings
+SETTINGS = {
+    "SESSION_SETTINGS": SESSION_SETTINGS,
+    "QL_SETTINGS": QL_SETTINGS,
+    "CAR_SETTINGS": CAR_SETTINGS,
+    "STATE_SETTINGS": STATE_SETTINGS,
+    "TILE_CODING_SETTINGS": TILE_CODING_SETTINGS,
+    "PARALLEL_SETTINGS": PARALLEL_SETTINGS,
+    "TRACK_SETTINGS": TRACK_SETTINGS,
+}
+
+# Flags for the settings the menu has sliders for, and a few more: (flag, settings, key, type, help)
+OPTIONS = (
+    ("--episodes", "SESSION_SETTINGS", "NUM_EPISODES", int, "Episodes to run"),
+    ("--duration", "SESSION_SETTINGS", "EPISODE_DURATION", float, "Seconds of simulated time per episode"),
+    ("--steps-per-second", "SESSION_SETTINGS", "STEPS_PER_SECOND", int, "Simulation steps per second of episode time"),
+    ("--save-every", "SESSION_SETTINGS", "SAVE_EVERY_EPISODES", int, "Episodes between Q-table saves"),
+    ("--seed", "SESSION_SETTINGS", "SEED", int, "Seed of a fresh training run"),
+    ("--cars", "SESSION_SETTINGS", "NUM_CARS", int, "Cars sharing the agent in each episode (q_table backend)"),
+    ("--learning-rate", "QL_SETTINGS", "LEARNING_RATE", float, "Alpha"),
+    ("--discount-factor", "QL_SETTINGS", "DISCOUNT_FACTOR", float, "Gamma"),
+    ("--exploration-rate", "QL_SETTINGS", "EXPLORATION_RATE", float, "Initial epsilon"),
+    ("--exploration-decay", "QL_SETTINGS", "EXPLORATION_DECAY", float, "Epsilon decay of the exponential schedule"),
+    ("--min-exploration-rate", "QL_SETTINGS", "MIN_EXPLORATION_RATE", float, "Final epsilon"),
+    ("--exploration-schedule", "QL_SETTINGS", "EXPLORATION_SCHEDULE", str, "exponential, linear or cosine"),
+    ("--backend", "QL_SETTINGS", "AGENT_BACKEND", str, "q_table or tile_coding"),
+    ("--max-speed", "CAR_SETTINGS", "MAX_SPEED", float, "Car speed limit on the track"),
+    ("--acceleration", "CAR_SETTINGS", "ACCELERATION", float, "Car acceleration"),
+    ("--deceleration", "CAR_SETTINGS", "DESACCELERATION", float, "Natural deceleration factor"),
+    ("--rotation-speed", "CAR_SETTINGS", "ROTATION_SPEED", float, "Car rotation speed"),
+)
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        description="Train or evaluate an agent without the menu, for scripts and job schedulers. "
+                    "Settings come from simulation_settings.py, then the config file, then the flags."
+    )
+    parser.add_argument("--config", help="JSON file of settings by dict name, e.g. "
+                                         '{"track": "track_2.png", "QL_SETTINGS": {"LEARNING_RATE": 0.3}}')
+    parser.add_argument("--track", help="Track image in tracks/ (default: the config's, else the first one)")
+    for flag, _, _, value_type, help_text in OPTIONS:
+        parser.add_argument(flag, type=value_type, help=help_text)
+    parser.add_argument("--model", help="Model file to train or evaluate, a name in q_learning_implementation/"
+                                        "q_tables or a path; logs are named after it in q_learning_logs")
+    parser.add_argument("--set", action="append", default=[], metavar="SETTINGS.KEY=VALUE",
+                        help="Any other setting, e.g. QL_SETTINGS.REPLAY_BUFFER_SIZE=5000 (VALUE is read as JSON)")
+    parser.add_argument("--render", action="store_true", help="Open a window and draw the simulation (default: headless)")
+    parser.add_argument("--evaluate", action="store_true", help="Evaluate the saved model instead of training it")
+    parser.add_argument("--no-resume", action="store_true", help="Start afresh instead of resuming from a checkpoint")
+    parser.add_argument("--workers", type=int, help="Train with this many worker processes (the parallel trainer)")
+    parser.add_argument("--summary", help="Also write the end-of-run summary to this JSON file")
+    return parser
+
+
+def apply_settings(settings, source):
+    """Update the settings dicts from {settings name: {key: value}}; unknown names are errors."""
+    for name, values in settings.items():
+        if name not in SETTINGS:
+            raise ValueError(f"{source}: unknown settings {name!r}, expected one of {', '.join(SETTINGS)}")
+        for key, value in values.items():
+            if key not in SETTINGS[name]:
+                raise ValueError(f"{source}: unknown setting {name}[{key!r}]")
+            SETTINGS[name][key] = value
+
+
+def parse_assignment(assignment):
+    """SETTINGS.KEY=VALUE as {SETTINGS: {KEY: VALUE}}, with VALUE read as JSON where it can be."""
+    target, separator, value = assignment.partition("=")
+    name, dot, key = target.partition(".")
+    if not separator or not dot:
+        raise ValueError(f"--set {assignment}: expected SETTINGS.KEY=VALUE")
+    try:
+        value = json.loads(value)
+    except json.JSONDecodeError:
+        pass  # Plain strings need no quotes
+    return {name: {key: value}}
+
+
+def configure(args):
+    """Apply the config file and flags to the settings; returns the track to run on."""
+    SESSION_SETTINGS.update(HEADLESS=True, MANUAL_CONTROL=False, LIVE_PLOT=False)  # Nobody is watching
+    track = None
+    if args.config:
+        with open(args.config, "r") as f:
+            config = json.load(f)
+        track = config.pop("track", None)
+        apply_settings(config, args.config)
+    for assignment in args.set:
+        apply_settings(parse_assignment(assignment), "--set")
+    for flag, name, key, _, _ in OPTIONS:
+        value = getattr(args, flag[2:].replace("-", "_"))
+        if value is not None:
+            SETTINGS[name][key] = value
+    if args.render:
+        SESSION_SETTINGS["HEADLESS"] = False
+    if args.evaluate:
+        SESSION_SETTINGS["TRAINING_MODE"] = False
+    if args.no_resume:
+        SESSION_SETTINGS["RESUME"] = False
+    if args.workers:
+        PARALLEL_SETTINGS["NUM_WORKERS"] = args.workers
+    if args.model:
+        if QL_SETTINGS["AGENT_BACKEND"] == "tile_coding":
+            TILE_CODING_SETTINGS["WEIGHTS_FILENAME"] = args.model
+        else:
+            QL_SETTINGS["Q_TABLE_FILENAME"] = args.model
+
+    track = args.track or track
+    if track is None:
+        tracks = sorted(f for f in os.listdir(TRACKS_DIR) if f.endswith(".png"))
+        if not tracks:
+            raise ValueError(f"No tracks found in {TRACKS_DIR}")
+        track = tracks[0]
+    if not os.path.exists(os.path.join(TRACKS_DIR, track)):
+        raise ValueError(f"Track {track!r} not found in {TRACKS_DIR}")
+    return track
+
+
+def train_parallel(track, workers):
+    from q_learning_implementation.parallel_trainer import ParallelTrainer
+    from q_learning_logs.logger import Logger
+    from main import session_summary
+
+    trainer = ParallelTrainer(tracks=[track], num_workers=workers)
+    log_filename = os.path.splitext(os.path.basename(trainer.agent.q_table_path))[0] + ".txt"
+    num_episodes = SESSION_SETTINGS["NUM_EPISODES"]
+    scores = trainer.train(num_episodes, logger=Logger(log_filename))
+    return session_summary(track, True, scores, trainer.agent, completed=trainer.episode >= num_episodes)
+
+
+def print_summary(summary):
+    print(f"Summary: {summary['episodes']} {summary['mode']} episodes on {summary['track']} "
+          f"in {summary['wall_time']:.1f}s{'' if summary['completed'] else ' (stopped early)'}")
+    if summary["episodes"]:
+        last = summary["scores"][-10:]
+        print(f"  Scores: mean {summary['mean_score']:.1f}, best {summary['best_score']:.1f}, "
+              f"mean of last {len(last)} {sum(last) / len(last):.1f}")
+    print(f"  Model: {summary['model_path']} ({summary['model_size']} states)")
+
+
+def main():
+    parser = make_parser()
+    args = parser.parse_args()
+    # Paths given on the command line are relative to where it was run; everything else to the project
+    if args.config:
+        args.config = os.path.abspath(args.config)
+    if args.summary:
+        args.summary = os.path.abspath(args.summary)
+    if args.model and os.path.dirname(args.model):
+        args.model = os.path.abspath(args.model)
+    os.chdir(PROJECT_ROOT)
+    try:
+        track = configure(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.workers and (not SESSION_SETTINGS["TRAINING_MODE"] or QL_SETTINGS["AGENT_BACKEND"] != "q_table"):
+        parser.error("--workers trains a Q-table in parallel and cannot evaluate or train other backends")
+
+    started = time.perf_counter()
+    if args.workers:
+        summary = train_parallel(track, args.workers)
+    else:
+        from main import start_simulation
+        summary = start_simulation(track)
+    if summary is None:
+        sys.exit(1)
+    summary["wall_time"] = time.perf_counter() - started
+    print_summary(summary)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(0 if summary["completed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import subprocess
 import sys
 
 from simulation_settings import SESSION_SETTINGS, QL_SETTINGS, CAR_SETTINGS
+from q_learning_implementation.agent_factory import log_name
 
 TRACKS_DIR = "tracks"
 TRACKS = [f for f in os.listdir(TRACKS_DIR) if f.endswith('.png')]
@@ -14,7 +15,7 @@ def view_progress_graph():
     # Launch the plot_progress.py script in a new process
     python_exe = sys.executable
     script_path = os.path.join("log_plots", "plot_progress.py")
-    subprocess.Popen([python_exe, script_path])
+    subprocess.Popen([python_exe, script_path, "--log", log_name()])
 
 def set_episode_duration(value):
     SESSION_SETTINGS["EPISODE_DURATION"] = int(value)
@@ -52,17 +53,21 @@ def set_rotation_speed(value):
 def set_manual_control(value):
     SESSION_SETTINGS["MANUAL_CONTROL"] = value
 
+def set_headless(value):
+    SESSION_SETTINGS["HEADLESS"] = value
+
 def set_track(selected, value):
     global selected_track
     selected_track = value
 
-def settings_menu(menu, start_callback):
+def settings_menu(menu, start_callback, compare_callback=None):
     menu.clear()
     menu.add.label('Settings', font_size=30)
     # Session settings
     menu.add.range_slider('Episode Duration', SESSION_SETTINGS["EPISODE_DURATION"], (5, 120), 1, onchange=set_episode_duration)
     menu.add.range_slider('Num Episodes', SESSION_SETTINGS["NUM_EPISODES"], (1, 500), 1, onchange=set_num_episodes)
     menu.add.toggle_switch('Manual Control', SESSION_SETTINGS["MANUAL_CONTROL"], onchange=set_manual_control, width=150)
+    menu.add.toggle_switch('Headless Training', SESSION_SETTINGS["HEADLESS"], onchange=set_headless, width=150)
     menu.add.vertical_margin(15)
     # Q-learning settings
     menu.add.label('Q-Learning Settings', font_size=24)
@@ -78,20 +83,22 @@ def settings_menu(menu, start_callback):
     menu.add.range_slider('Acceleration', CAR_SETTINGS["ACCELERATION"], (0.01, 1.0), 0.01, onchange=set_acceleration)
     menu.add.range_slider('Deceleration', CAR_SETTINGS["DESACCELERATION"], (0.80, 1.0), 0.01, onchange=set_deceleration)
     menu.add.range_slider('Rotation Speed', CAR_SETTINGS["ROTATION_SPEED"], (1, 20), 1, onchange=set_rotation_speed)
-    menu.add.button('Back', lambda: main_menu(menu, start_callback))
+    menu.add.button('Back', lambda: main_menu(menu, start_callback, compare_callback))
 
-def main_menu(menu, start_callback):
+def main_menu(menu, start_callback, compare_callback=None):
     menu.clear()
     menu.add.label('Self-Driving Car Simulator', font_size=40)
     menu.add.button('Start Simulation', lambda: start_callback(selected_track))
-    menu.add.button('Settings', lambda: settings_menu(menu, start_callback))
+    if compare_callback:
+        menu.add.button('Compare Agents', lambda: compare_callback(selected_track))
+    menu.add.button('Settings', lambda: settings_menu(menu, start_callback, compare_callback))
     menu.add.selector('Select Track: ', [(t, t) for t in TRACKS], onchange=set_track)
     menu.add.button('View Progress Graph', view_progress_graph)
     menu.add.button('Quit', pygame_menu.events.EXIT)
 
-def launch_menu(start_callback):
+def launch_menu(start_callback, compare_callback=None):
     pygame.init()
     surface = pygame.display.set_mode((600, 700))
     menu = pygame_menu.Menu('Main Menu', 600, 700, theme=pygame_menu.themes.THEME_DARK)
-    main_menu(menu, start_callback)
+    main_menu(menu, start_callback, compare_callback)
     menu.mainloop(surface)
\ No newline at end of file